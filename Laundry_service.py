@@ -1,26 +1,123 @@
-import sqlite3
-import hashlib
 import time
-from datetime import datetime, timedelta
-import qrcode
+
+# Taken before the remaining imports so the startup report includes them
+IMPORT_STARTED = time.perf_counter()
+
+import sqlite3
+from datetime import datetime
 from io import BytesIO
 import tkinter as tk
-from tkinter import ttk, messagebox, PhotoImage
-from PIL import Image, ImageTk
-import webbrowser
+from tkinter import ttk, messagebox
+from change_feed import CHANGED_IDS_QUERY, ChangeFeed
+from database import check_query_plans, fetch_by_ids, open_database
+from metrics import METRICS, MetricsExporter
+from profiling import PROFILER, SLOW_LOG_PATH
+from order_service import (ORDER_QUERY_PLAN_CHECKS, ORDER_STATUSES, OrderFilter, OrderService, OrderServiceError,
+                           hash_password)
+# qr_codes pulls in qrcode and PIL only when the first QR code is rendered;
+# PIL.ImageTk is likewise imported where a QR code is first displayed
+from qr_codes import QR_STORE_DIR, QRCache, QRStore, render_qr_image, render_qr_png
+from task_runner import TaskRunner
+
+# Number of orders fetched per page in the admin orders grid
+ORDERS_PAGE_SIZE = 100
+
+# Refresh buttons only apply rows changed since the last refresh
+INCREMENTAL_REFRESH = True
+
+# Persist each receipt QR as a PNG in laundry_orders.qr_code; when False only
+# the receipt text is stored and show_receipt renders the QR on demand
+STORE_QR_PNG = True
+
+# Periods offered on the Statistics tab, as a number of days (None = all history)
+STATS_PERIODS = {
+    "Today": 1,
+    "Last 7 days": 7,
+    "Last 30 days": 30,
+    "Last 365 days": 365,
+    "All time": None,
+}
+
+# How often (ms) the "Remaining Time" column of My Orders is redrawn
+COUNTDOWN_INTERVAL = 1000
+
+# Update the New Order total as the customer types instead of on "Calculate Price"
+LIVE_QUOTE = True
+
+# Quiet time (ms) after the last edit before the live quote is recomputed
+QUOTE_DEBOUNCE_MS = 150
+
+# Run the EXPLAIN QUERY PLAN self-check on startup
+CHECK_QUERY_PLANS = True
+
+# Also print how long startup, login, screen changes and each dashboard tab
+# take to become ready; they are always timed into PROFILER ("ready") for the
+# Diagnostics tab when PROFILE_UI is on
+STARTUP_TIMING = False
+
+# Build each screen once and raise it on later visits instead of destroying
+# and rebuilding every widget on login and logout
+CACHE_SCREENS = True
+
+# Time Tk callbacks and background tasks into profiling.PROFILER for the
+# Diagnostics tab; SQL statements are timed by database.PROFILE_QUERIES
+PROFILE_UI = True
+
+# Publish metrics.METRICS for Prometheus (see metrics.METRICS_ADDRESS and
+# METRICS_TEXTFILE_PATH) when this terminal owns its database. Orders are
+# counted by whichever process commits them (see database.EXPORT_METRICS), so a
+# terminal of a shared server leaves the port to the server.
+EXPORT_METRICS = True
+
+# Work pending for longer than this (ms) shows the "Working..." indicator, so
+# quick queries do not make it flicker
+BUSY_INDICATOR_DELAY = 200
+
+# Queries on the hot paths outside OrderService, also run through check_query_plans
+USERS_QUERY = '''
+    SELECT id, username, email, phone, is_admin, created_at FROM users
+'''
+
+# (name, query, sample parameters, may walk an index in order), checked by
+# database.check_query_plans on startup
+QUERY_PLAN_CHECKS = ORDER_QUERY_PLAN_CHECKS + (
+    ("changed ids", CHANGED_IDS_QUERY, (0, 0, "laundry_orders"), False),
+)
+
+
+class ProfiledCallWrapper(tk.CallWrapper):
+    # Every Tk callback (button commands, bindings, after() timers) runs
+    # through tkinter's CallWrapper; this one also times it
+
+    def __call__(self, *args):
+        name = getattr(self.func, "__qualname__", repr(self.func))
+        if name.endswith("<locals>.callit"):
+            # after() wraps its callback but keeps the callback's name
+            name = f"after: {self.func.__name__}"
+        with PROFILER.timed("callback", name):
+            return super().__call__(*args)
+
 
 class LaundryManagementSystem:
     def __init__(self, root):
         self.root = root
         self.root.title("Laundry Management System")
         self.root.geometry("800x600")
+        self.report_timing("imports", IMPORT_STARTED)
+
+        # Installed before any widget registers a callback
+        if PROFILE_UI:
+            tk.CallWrapper = ProfiledCallWrapper
 
         # Initialize database
+        started = time.perf_counter()
         self.initialize_database()
+        self.report_timing("database", started)
 
-        # Current user info
+        # Current user info; session changes on every login and logout
         self.current_user = None
         self.is_admin = False
+        self.session = 0
 
         # Colors
         self.bg_color = "#ffffff"
@@ -30,91 +127,171 @@ class LaundryManagementSystem:
         # QR code image reference
         self.qr_photo = None
 
+        # Queries, writes and QR renders run off the Tk main thread; results
+        # come back through the Tk loop
+        self.tasks = TaskRunner(self.root, on_busy=self.set_busy, profiler=PROFILER if PROFILE_UI else None)
+        self.busy_label = tk.Label(self.root, text="Working...", bg="#fff3cd", fg=self.text_color, padx=8)
+        self.busy_after = None
+        self.qr_cache = QRCache()
+        self.qr_store = QRStore(QR_STORE_DIR) if QR_STORE_DIR else None
+        self.store_qr_png = STORE_QR_PNG
+
+        # Change feed: local writes are announced at once, other terminals'
+        # writes are picked up from change_log; open dashboards subscribe
+        self.change_feed = ChangeFeed(self.db, self.root, tasks=self.tasks)
+        self.feed_subscriptions = []
+        self.change_feed.start()
+
+        # Order pipeline shared with scripts and other front ends
+        self.order_service = OrderService(self.db, self.qr_store, feed=self.change_feed)
+        if EXPORT_METRICS and getattr(self.db, "metrics", None) is not None:
+            METRICS.task_queue_depth.set_function(lambda: self.tasks.pending)
+            # Other terminals on the same file write orders this process never
+            # sees commit; re-seed the status gauge when the feed reports them
+            self.change_feed.subscribe("laundry_orders",
+                                       lambda order_ids: self.tasks.submit(self.db.seed_order_metrics))
+            self.metrics_exporter = MetricsExporter().start()
+
+        # Keyset pagination state for the admin orders grid
+        self.orders_page_size = ORDERS_PAGE_SIZE
+        self.orders_last_key = None
+        self.orders_exhausted = False
+        self.orders_loading = False
+        # Active OrderFilter of the search bar, None when showing every order
+        self.orders_filter = None
+
+        # Change log watermark per Treeview, used by incremental refresh
+        self.incremental_refresh = INCREMENTAL_REFRESH
+        self.sync_watermarks = {}
+
+        # Pickup countdowns in "My Orders": epoch pickup time per tree row, and
+        # the pending after() id of the ticker
+        self.countdowns = {}
+        self.countdown_after = None
+
+        # Pending after() id of the debounced live quote
+        self.live_quote = LIVE_QUOTE
+        self.quote_after = None
+
+        # Dashboard tabs not built yet, by notebook tab id -> (title, builder)
+        self.lazy_tabs = {}
+
+        # Screen frames by name, the change feed subscriptions each one renews
+        # when shown again, and the name of the screen on top
+        self.cache_screens = CACHE_SCREENS
+        self.screens = {}
+        self.screen_feeds = {}
+        self.current_screen = None
+
         self.show_login_screen()
+        # Idle callbacks run once the login screen has been drawn
+        self.root.after_idle(lambda: self.report_timing("login screen", IMPORT_STARTED))
 
     def initialize_database(self):
-        self.conn = sqlite3.connect('laundry.db')
-        self.cursor = self.conn.cursor()
-
-        # Create tables if they don't exist
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                phone TEXT,
-                is_admin INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS laundry_orders (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                service_id INTEGER NOT NULL,
-                order_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                pickup_date TIMESTAMP,
-                status TEXT DEFAULT 'Pending',
-                weight REAL NOT NULL,
-                total_price REAL NOT NULL,
-                payment_method TEXT DEFAULT NULL,
-                payment_status TEXT DEFAULT 'Pending',
-                qr_code BLOB,
-                FOREIGN KEY (user_id) REFERENCES users (id),
-                FOREIGN KEY (service_id) REFERENCES services (id)
-            )
-        ''')
-
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS services (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                price_per_kg REAL NOT NULL,
-                description TEXT,
-                estimated_time_hours INTEGER NOT NULL
-            )
-        ''')
-
-        # Insert default services if none exist
-        self.cursor.execute("SELECT COUNT(*) FROM services")
-        if self.cursor.fetchone()[0] == 0:
-            default_services = [
-                ('Regular Wash', 5.0, 'Basic washing and drying', 24),
-                ('Express Wash', 8.0, 'Fast washing and drying (priority)', 12),
-                ('Dry Cleaning', 10.0, 'Professional dry cleaning', 48),
-                ('Ironing Only', 3.0, 'Ironing service without washing', 6)
-            ]
-            self.cursor.executemany('''
-                INSERT INTO services (name, price_per_kg, description, estimated_time_hours)
-                VALUES (?, ?, ?, ?)
-            ''', default_services)
-
-        # Create admin if not exists
-        self.cursor.execute("SELECT COUNT(*) FROM users WHERE is_admin = 1")
-        if self.cursor.fetchone()[0] == 0:
-            admin_password = hashlib.sha256("admin123".encode()).hexdigest()
-            self.cursor.execute('''
-                INSERT INTO users (username, password, email, is_admin)
-                VALUES (?, ?, ?, 1)
-            ''', ("admin", admin_password, "admin@laundry.com"))
-
-        self.conn.commit()
-
-    def clear_window(self):
+        # Connection pool (or shared server) used by every query in the app
+        self.db = open_database()
+
+        if CHECK_QUERY_PLANS:
+            check_query_plans(self.db, QUERY_PLAN_CHECKS)
+
+    def show_screen(self, name, build, enter):
+        # Screens are built into their own frame on first use and raised on
+        # later visits; enter() resets the per-user parts every time
+        started = time.perf_counter()
+        self.leave_screen()
+
+        self.current_screen = name
+        frame = self.screens.get(name)
+        if frame is None:
+            frame = tk.Frame(self.root, bg=self.bg_color)
+            frame.place(relx=0, rely=0, relwidth=1, relheight=1)
+            self.screens[name] = frame
+            self.screen_feeds[name] = []
+            build(frame)
+            enter()
+        else:
+            enter()
+            # Catch up on whatever changed while the screen was hidden
+            for table_name, callback in self.screen_feeds[name]:
+                self.feed_subscriptions.append(self.change_feed.subscribe(table_name, callback))
+                callback(set())
+
+        frame.tkraise()
+        self.root.after_idle(lambda: self.report_timing(f"{name} screen", started))
+
+    def leave_screen(self):
+        # A hidden screen gets no change notifications, timers, dialogs or
+        # pending refreshes; writes already submitted still complete
+        for unsubscribe in self.feed_subscriptions:
+            unsubscribe()
+        self.feed_subscriptions = []
+        self.tasks.cancel()
+
+        for after_id in (self.countdown_after, self.quote_after):
+            if after_id is not None:
+                self.root.after_cancel(after_id)
+        self.countdown_after = None
+        self.quote_after = None
+
         for widget in self.root.winfo_children():
-            widget.destroy()
+            if isinstance(widget, tk.Toplevel):
+                widget.destroy()
+
+        if not self.cache_screens and self.current_screen in self.screens:
+            frame = self.screens.pop(self.current_screen)
+            del self.screen_feeds[self.current_screen]
+            self.lazy_tabs = {tab: lazy for tab, lazy in self.lazy_tabs.items()
+                              if not tab.startswith(str(frame) + ".")}
+            frame.destroy()
+        self.current_screen = None
+
+    def subscribe_changes(self, table_name, callback):
+        # Subscriptions belong to the current screen and are renewed with it
+        self.screen_feeds[self.current_screen].append((table_name, callback))
+        self.feed_subscriptions.append(self.change_feed.subscribe(table_name, callback))
+
+    def set_busy(self, busy):
+        if self.busy_after is not None:
+            self.root.after_cancel(self.busy_after)
+            self.busy_after = None
+
+        if busy:
+            self.busy_after = self.root.after(BUSY_INDICATOR_DELAY, self.show_busy)
+        else:
+            self.busy_label.place_forget()
+
+    def show_busy(self):
+        # The window stays usable; this only says results are on their way
+        self.busy_after = None
+        self.busy_label.place(relx=1.0, rely=1.0, anchor="se", x=-10, y=-10)
+        self.busy_label.lift()
+
+    def in_session(self, callback):
+        # Wraps the callback or error handler of a write so it is skipped if
+        # the user who submitted it has logged out since; leave_screen() does
+        # not cancel writes, so without this their dialogs and refreshes land
+        # on the next user's screen
+        session = self.session
+
+        def run(result):
+            if self.session == session:
+                callback(result)
+        return run
+
+    def report_timing(self, label, started):
+        seconds = time.perf_counter() - started
+        if PROFILE_UI:
+            PROFILER.record("ready", label, seconds)
+        if STARTUP_TIMING:
+            print(f"Timing: {label} ready in {seconds * 1000:.1f} ms")
 
     def show_login_screen(self):
-        self.clear_window()
         self.current_user = None
         self.is_admin = False
+        self.session += 1
+        self.show_screen("login", self.build_login_screen, self.enter_login_screen)
 
-        # Main frame
-        main_frame = tk.Frame(self.root, bg=self.bg_color)
-        main_frame.pack(fill=tk.BOTH, expand=True)
-
+    def build_login_screen(self, main_frame):
         # Title
         title_label = tk.Label(main_frame, text="Laundry Management System", font=("Arial", 20, "bold"),
                              bg=self.bg_color, fg=self.text_color)
@@ -143,13 +320,16 @@ class LaundryManagementSystem:
                                    bg=self.button_color, fg="white")
         register_button.pack(pady=10)
 
-    def show_register_screen(self):
-        self.clear_window()
+    def enter_login_screen(self):
+        # The previous user's credentials must not be left on screen
+        self.username_entry.delete(0, tk.END)
+        self.password_entry.delete(0, tk.END)
+        self.username_entry.focus_set()
 
-        # Main frame
-        main_frame = tk.Frame(self.root, bg=self.bg_color)
-        main_frame.pack(fill=tk.BOTH, expand=True)
+    def show_register_screen(self):
+        self.show_screen("register", self.build_register_screen, self.enter_register_screen)
 
+    def build_register_screen(self, main_frame):
         # Title
         title_label = tk.Label(main_frame, text="Register New Account", font=("Arial", 20, "bold"),
                              bg=self.bg_color, fg=self.text_color)
@@ -193,6 +373,12 @@ class LaundryManagementSystem:
                                bg=self.button_color, fg="white")
         back_button.pack(pady=10)
 
+    def enter_register_screen(self):
+        for entry in (self.reg_username_entry, self.reg_password_entry, self.reg_confirm_password_entry,
+                      self.reg_email_entry, self.reg_phone_entry):
+            entry.delete(0, tk.END)
+        self.reg_username_entry.focus_set()
+
     def login(self):
         username = self.username_entry.get()
         password = self.password_entry.get()
@@ -201,29 +387,25 @@ class LaundryManagementSystem:
             messagebox.showerror("Error", "Please enter both username and password")
             return
 
-        hashed_password = hashlib.sha256(password.encode()).hexdigest()
-
-        self.cursor.execute('''
-            SELECT id, username, is_admin FROM users
-            WHERE username = ? AND password = ?
-        ''', (username, hashed_password))
+        started = time.perf_counter()
 
-        user = self.cursor.fetchone()
+        def logged_in(user):
+            if not user:
+                messagebox.showerror("Error", "Invalid username or password")
+                return
 
-        if user:
-            self.current_user = {
-                'id': user[0],
-                'username': user[1],
-                'is_admin': bool(user[2])
-            }
-            self.is_admin = bool(user[2])
+            self.current_user = user._asdict()
+            self.is_admin = user.is_admin
+            self.session += 1
 
             if self.is_admin:
                 self.show_admin_dashboard()
             else:
                 self.show_customer_dashboard()
-        else:
-            messagebox.showerror("Error", "Invalid username or password")
+            self.root.after_idle(lambda: self.report_timing("dashboard", started))
+
+        self.tasks.submit(self.order_service.login, username, password, callback=logged_in,
+                          error=lambda e: messagebox.showerror("Error", f"Login failed: {str(e)}"))
 
     def register(self):
         username = self.reg_username_entry.get()
@@ -240,53 +422,136 @@ class LaundryManagementSystem:
             messagebox.showerror("Error", "Passwords do not match")
             return
 
-        hashed_password = hashlib.sha256(password.encode()).hexdigest()
+        hashed_password = hash_password(password)
 
-        try:
-            self.cursor.execute('''
-                INSERT INTO users (username, password, email, phone)
-                VALUES (?, ?, ?, ?)
-            ''', (username, hashed_password, email, phone))
-            self.conn.commit()
+        def registered(user_id):
             messagebox.showinfo("Success", "Registration successful! Please login.")
             self.show_login_screen()
-        except sqlite3.IntegrityError as e:
-            if "username" in str(e):
+
+        def failed(e):
+            if isinstance(e, sqlite3.IntegrityError) and "username" in str(e):
                 messagebox.showerror("Error", "Username already exists")
-            elif "email" in str(e):
+            elif isinstance(e, sqlite3.IntegrityError) and "email" in str(e):
                 messagebox.showerror("Error", "Email already exists")
             else:
                 messagebox.showerror("Error", "Registration failed")
 
-    def show_admin_dashboard(self):
-        self.clear_window()
+        self.tasks.submit(self.db.insert, '''
+            INSERT INTO users (username, password, email, phone)
+            VALUES (?, ?, ?, ?)
+        ''', (username, hashed_password, email, phone), callback=registered, error=failed)
 
-        # Main frame
-        main_frame = tk.Frame(self.root, bg=self.bg_color)
-        main_frame.pack(fill=tk.BOTH, expand=True)
+    def show_admin_dashboard(self):
+        self.show_screen("admin", self.build_admin_dashboard, self.enter_admin_dashboard)
 
-        # Title
-        title_label = tk.Label(main_frame, text=f"Admin Dashboard - Welcome {self.current_user['username']}",
-                             font=("Arial", 20, "bold"), bg=self.bg_color, fg=self.text_color)
-        title_label.pack(pady=20)
+    def build_admin_dashboard(self, main_frame):
+        # Title, filled in with the username by enter_admin_dashboard
+        self.admin_title_label = tk.Label(main_frame, font=("Arial", 20, "bold"), bg=self.bg_color, fg=self.text_color)
+        self.admin_title_label.pack(pady=20)
 
         # Notebook for tabs
-        notebook = ttk.Notebook(main_frame)
+        self.admin_notebook = notebook = ttk.Notebook(main_frame)
         notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
-        # Orders tab
-        orders_frame = tk.Frame(notebook, bg=self.bg_color)
-        notebook.add(orders_frame, text="Manage Orders")
+        # Tabs are built and loaded the first time they are selected, so a
+        # large database does not delay the dashboard itself
+        notebook.bind("<<NotebookTabChanged>>", lambda event: self.on_tab_changed(event.widget))
+        self.add_lazy_tab(notebook, "Manage Orders", self.build_orders_tab)
+        self.add_lazy_tab(notebook, "Manage Services", self.build_services_tab)
+        self.add_lazy_tab(notebook, "Manage Users", self.build_users_tab)
+        self.add_lazy_tab(notebook, "Statistics", self.build_statistics_tab)
+        self.add_lazy_tab(notebook, "Diagnostics", self.build_diagnostics_tab)
+
+        # Logout button
+        logout_button = tk.Button(main_frame, text="Logout", command=self.show_login_screen,
+                                bg="red", fg="white")
+        logout_button.pack(pady=10)
+
+        # The orders tab is selected already; build it now
+        self.orders_filter = None
+        self.on_tab_changed(notebook)
+
+    def enter_admin_dashboard(self):
+        self.admin_title_label.config(text=f"Admin Dashboard - Welcome {self.current_user['username']}")
+
+        # Each admin starts on an unfiltered orders tab
+        self.admin_notebook.select(0)
+        self.orders_tree.selection_remove(self.orders_tree.selection())
+        self.orders_loading = False
+        if self.orders_filter is not None:
+            self.clear_orders_filter()
+
+    def add_lazy_tab(self, notebook, text, build):
+        frame = tk.Frame(notebook, bg=self.bg_color)
+        notebook.add(frame, text=text)
+        self.lazy_tabs[str(frame)] = (text, lambda: build(frame))
+
+    def on_tab_changed(self, notebook):
+        # Builds the selected tab if it has not been shown yet
+        text, build = self.lazy_tabs.pop(str(notebook.select()), (None, None))
+        if build is None:
+            return
+
+        started = time.perf_counter()
+        build()
+        self.report_timing(f"{text} tab", started)
+
+    def build_orders_tab(self, orders_frame):
+        # Search and filter bar; the predicates run in SQL against the indexes
+        filter_frame = tk.Frame(orders_frame, bg=self.bg_color)
+        filter_frame.pack(fill=tk.X, padx=10, pady=(10, 0))
+
+        tk.Label(filter_frame, text="Order ID:", bg=self.bg_color, fg=self.text_color).pack(side=tk.LEFT)
+        self.filter_id_entry = tk.Entry(filter_frame, width=8)
+        self.filter_id_entry.pack(side=tk.LEFT, padx=(0, 5))
+
+        tk.Label(filter_frame, text="Customer:", bg=self.bg_color, fg=self.text_color).pack(side=tk.LEFT)
+        self.filter_customer_entry = tk.Entry(filter_frame, width=15)
+        self.filter_customer_entry.pack(side=tk.LEFT, padx=(0, 5))
+
+        tk.Label(filter_frame, text="Status:", bg=self.bg_color, fg=self.text_color).pack(side=tk.LEFT)
+        self.filter_status_var = tk.StringVar()
+        ttk.Combobox(filter_frame, textvariable=self.filter_status_var, values=("",) + ORDER_STATUSES,
+                     state="readonly", width=15).pack(side=tk.LEFT, padx=(0, 5))
+
+        tk.Label(filter_frame, text="Payment:", bg=self.bg_color, fg=self.text_color).pack(side=tk.LEFT)
+        self.filter_payment_var = tk.StringVar()
+        ttk.Combobox(filter_frame, textvariable=self.filter_payment_var, values=("", "Pending", "Paid"),
+                     state="readonly", width=8).pack(side=tk.LEFT, padx=(0, 5))
+
+        tk.Label(filter_frame, text="From:", bg=self.bg_color, fg=self.text_color).pack(side=tk.LEFT)
+        self.filter_from_entry = tk.Entry(filter_frame, width=11)
+        self.filter_from_entry.pack(side=tk.LEFT)
+
+        tk.Label(filter_frame, text="To:", bg=self.bg_color, fg=self.text_color).pack(side=tk.LEFT)
+        self.filter_to_entry = tk.Entry(filter_frame, width=11)
+        self.filter_to_entry.pack(side=tk.LEFT, padx=(0, 5))
+
+        tk.Button(filter_frame, text="Search", command=self.apply_orders_filter,
+                  bg=self.button_color, fg="white").pack(side=tk.LEFT, padx=2)
+        tk.Button(filter_frame, text="Clear", command=self.clear_orders_filter,
+                  bg=self.button_color, fg="white").pack(side=tk.LEFT, padx=2)
+
+        for entry in (self.filter_id_entry, self.filter_customer_entry, self.filter_from_entry, self.filter_to_entry):
+            entry.bind("<Return>", lambda event: self.apply_orders_filter())
+
+        # Treeview for orders, paged in as the user scrolls
+        orders_tree_frame = tk.Frame(orders_frame, bg=self.bg_color)
+        orders_tree_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
-        # Treeview for orders
         columns = ("ID", "Customer", "Order Date", "Pickup Date", "Status", "Weight", "Price", "Payment Method", "Payment Status")
-        self.orders_tree = ttk.Treeview(orders_frame, columns=columns, show="headings")
+        self.orders_tree = ttk.Treeview(orders_tree_frame, columns=columns, show="headings", selectmode="extended")
 
         for col in columns:
             self.orders_tree.heading(col, text=col)
             self.orders_tree.column(col, width=100, anchor=tk.CENTER)
 
-        self.orders_tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        orders_scrollbar = ttk.Scrollbar(orders_tree_frame, orient=tk.VERTICAL, command=self.orders_tree.yview)
+        self.orders_tree.configure(
+            yscrollcommand=lambda first, last: self.on_orders_scroll(orders_scrollbar, first, last))
+
+        orders_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.orders_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
         # Buttons frame
         buttons_frame = tk.Frame(orders_frame, bg=self.bg_color)
@@ -307,10 +572,18 @@ class LaundryManagementSystem:
                                   bg=self.button_color, fg="white")
         refresh_button.pack(side=tk.LEFT, padx=5)
 
-        # Services tab
-        services_frame = tk.Frame(notebook, bg=self.bg_color)
-        notebook.add(services_frame, text="Manage Services")
+        # Archived orders are only searched on request
+        archive_button = tk.Button(buttons_frame, text="Search Archive", command=self.show_archive_search_dialog,
+                                   bg=self.button_color, fg="white")
+        archive_button.pack(side=tk.LEFT, padx=5)
+
+        self.refresh_orders(full=True)
+
+        # Keep the grid current as orders change anywhere; None means the feed
+        # lost track and a full reload is needed
+        self.subscribe_changes("laundry_orders", lambda ids: self.refresh_orders(full=ids is None))
 
+    def build_services_tab(self, services_frame):
         # Treeview for services
         service_columns = ("ID", "Name", "Price/kg", "Description", "Est. Time (hrs)")
         self.services_tree = ttk.Treeview(services_frame, columns=service_columns, show="headings")
@@ -340,10 +613,10 @@ class LaundryManagementSystem:
                                         bg="red", fg="white")
         delete_service_button.pack(side=tk.LEFT, padx=5)
 
-        # Users tab
-        users_frame = tk.Frame(notebook, bg=self.bg_color)
-        notebook.add(users_frame, text="Manage Users")
+        self.refresh_services(full=True)
+        self.subscribe_changes("services", lambda ids: self.refresh_services(full=ids is None))
 
+    def build_users_tab(self, users_frame):
         # Treeview for users
         user_columns = ("ID", "Username", "Email", "Phone", "Admin", "Joined")
         self.users_tree = ttk.Treeview(users_frame, columns=user_columns, show="headings")
@@ -354,30 +627,118 @@ class LaundryManagementSystem:
 
         self.users_tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
-        # Logout button
-        logout_button = tk.Button(main_frame, text="Logout", command=self.show_login_screen,
-                                bg="red", fg="white")
-        logout_button.pack(pady=10)
+        self.refresh_users(full=True)
+        self.subscribe_changes("users", lambda ids: self.refresh_users(full=ids is None))
+
+    def build_statistics_tab(self, stats_frame):
+        # Read from the precomputed order_stats aggregates
+        stats_controls_frame = tk.Frame(stats_frame, bg=self.bg_color)
+        stats_controls_frame.pack(fill=tk.X, padx=10, pady=10)
+
+        tk.Label(stats_controls_frame, text="Period:", bg=self.bg_color, fg=self.text_color).pack(side=tk.LEFT)
+        self.stats_period_var = tk.StringVar(value="Last 30 days")
+        stats_period_dropdown = ttk.Combobox(stats_controls_frame, textvariable=self.stats_period_var,
+                                             values=list(STATS_PERIODS), state="readonly")
+        stats_period_dropdown.pack(side=tk.LEFT, padx=5)
+        stats_period_dropdown.bind("<<ComboboxSelected>>", lambda event: self.refresh_statistics())
+
+        stats_refresh_button = tk.Button(stats_controls_frame, text="Refresh", command=self.refresh_statistics,
+                                         bg=self.button_color, fg="white")
+        stats_refresh_button.pack(side=tk.LEFT, padx=5)
+
+        self.stats_summary_label = tk.Label(stats_frame, font=("Arial", 11, "bold"), justify=tk.LEFT,
+                                            bg=self.bg_color, fg=self.text_color)
+        self.stats_summary_label.pack(anchor="w", padx=10)
+
+        stats_columns = ("Orders", "Weight", "Revenue")
+        self.stats_tree = ttk.Treeview(stats_frame, columns=stats_columns, show="tree headings")
+        self.stats_tree.heading("#0", text="Group")
+        for col in stats_columns:
+            self.stats_tree.heading(col, text=col)
+            self.stats_tree.column(col, width=100, anchor=tk.CENTER)
+
+        self.stats_tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        self.refresh_statistics()
+
+    def build_diagnostics_tab(self, diagnostics_frame):
+        # Timings collected in this process by profiling.PROFILER
+        controls_frame = tk.Frame(diagnostics_frame, bg=self.bg_color)
+        controls_frame.pack(fill=tk.X, padx=10, pady=10)
+
+        tk.Button(controls_frame, text="Refresh", command=self.refresh_diagnostics,
+                  bg=self.button_color, fg="white").pack(side=tk.LEFT, padx=5)
+        tk.Button(controls_frame, text="Dump JSON", command=self.dump_diagnostics,
+                  bg=self.button_color, fg="white").pack(side=tk.LEFT, padx=5)
+        tk.Button(controls_frame, text="Reset", command=self.reset_diagnostics,
+                  bg="red", fg="white").pack(side=tk.LEFT, padx=5)
+
+        self.diagnostics_label = tk.Label(controls_frame, bg=self.bg_color, fg=self.text_color)
+        self.diagnostics_label.pack(side=tk.LEFT, padx=10)
+
+        columns = ("Kind", "Count", "Mean ms", "p95 ms", "Max ms", "Total ms")
+        self.diagnostics_tree = ttk.Treeview(diagnostics_frame, columns=columns, show="tree headings", height=12)
+        self.diagnostics_tree.heading("#0", text="Operation")
+        self.diagnostics_tree.column("#0", width=320)
+        for col in columns:
+            self.diagnostics_tree.heading(col, text=col)
+            self.diagnostics_tree.column(col, width=70, anchor=tk.CENTER)
+        self.diagnostics_tree.pack(fill=tk.BOTH, expand=True, padx=10)
+
+        # Slow operations, most recent first, with their query plans as children
+        tk.Label(diagnostics_frame, text="Slow operations", font=("Arial", 11, "bold"),
+                 bg=self.bg_color, fg=self.text_color).pack(anchor="w", padx=10, pady=(10, 0))
+        slow_columns = ("At", "Kind", "ms")
+        self.slow_tree = ttk.Treeview(diagnostics_frame, columns=slow_columns, show="tree headings", height=6)
+        self.slow_tree.heading("#0", text="Operation")
+        self.slow_tree.column("#0", width=420)
+        for col in slow_columns:
+            self.slow_tree.heading(col, text=col)
+            self.slow_tree.column(col, width=100, anchor=tk.CENTER)
+        self.slow_tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+
+        self.refresh_diagnostics()
+
+    def refresh_diagnostics(self):
+        # In-memory only, so no need for the task runner
+        stats = PROFILER.stats()
+        self.diagnostics_label.config(
+            text=f"{len(stats)} operations since {PROFILER.started.strftime('%H:%M:%S')}; "
+                 f"slower than {PROFILER.slow_ms} ms logged to {SLOW_LOG_PATH or 'memory only'}")
+
+        self.diagnostics_tree.delete(*self.diagnostics_tree.get_children())
+        for row in stats:
+            self.diagnostics_tree.insert("", tk.END, text=row["name"], values=(
+                row["kind"], row["count"], row["mean_ms"], row["p95_ms"], row["max_ms"], row["total_ms"]))
+
+        self.slow_tree.delete(*self.slow_tree.get_children())
+        for entry in reversed(PROFILER.recent_slow()):
+            item = self.slow_tree.insert("", tk.END, text=entry["name"], values=(entry["at"], entry["kind"], entry["ms"]))
+            for step in entry["plan"] or ():
+                self.slow_tree.insert(item, tk.END, text=step)
+
+    def dump_diagnostics(self):
+        try:
+            path = PROFILER.dump()
+            messagebox.showinfo("Diagnostics", f"Statistics written to {path}")
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to write statistics: {str(e)}")
 
-        # Load initial data
-        self.refresh_orders()
-        self.refresh_services()
-        self.refresh_users()
+    def reset_diagnostics(self):
+        PROFILER.reset()
+        self.refresh_diagnostics()
 
     def show_customer_dashboard(self):
-        self.clear_window()
+        self.show_screen("customer", self.build_customer_dashboard, self.enter_customer_dashboard)
 
-        # Main frame
-        main_frame = tk.Frame(self.root, bg=self.bg_color)
-        main_frame.pack(fill=tk.BOTH, expand=True)
-
-        # Title
-        title_label = tk.Label(main_frame, text=f"Customer Dashboard - Welcome {self.current_user['username']}",
-                             font=("Arial", 20, "bold"), bg=self.bg_color, fg=self.text_color)
-        title_label.pack(pady=20)
+    def build_customer_dashboard(self, main_frame):
+        # Title, filled in with the username by enter_customer_dashboard
+        self.customer_title_label = tk.Label(main_frame, font=("Arial", 20, "bold"), bg=self.bg_color,
+                                             fg=self.text_color)
+        self.customer_title_label.pack(pady=20)
 
         # Notebook for tabs
-        notebook = ttk.Notebook(main_frame)
+        self.customer_notebook = notebook = ttk.Notebook(main_frame)
         notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
         # New Order tab
@@ -390,31 +751,33 @@ class LaundryManagementSystem:
         self.service_var = tk.StringVar()
         self.service_dropdown = ttk.Combobox(new_order_frame, textvariable=self.service_var, state="readonly")
         self.service_dropdown.pack(pady=5)
-
-        # Load services
-        self.cursor.execute("SELECT id, name, price_per_kg, estimated_time_hours FROM services")
-        services = self.cursor.fetchall()
-        self.services = {f"{s[1]} (RM{s[2]}/kg, {s[3]} hrs)": s[0] for s in services}
-        self.service_dropdown['values'] = list(self.services.keys())
+        self.services = {}
+        self.sync_watermarks.pop("catalog", None)
 
         # Weight input
         tk.Label(new_order_frame, text="Weight (kg):", bg=self.bg_color, fg=self.text_color).pack(pady=5)
-        self.weight_entry = tk.Entry(new_order_frame)
+        weight_var = tk.StringVar()
+        self.weight_entry = tk.Entry(new_order_frame, textvariable=weight_var)
         self.weight_entry.pack(pady=5)
 
-        # Calculate button
-        calculate_button = tk.Button(new_order_frame, text="Calculate Price", command=self.calculate_price,
-                                   bg=self.button_color, fg="white")
-        calculate_button.pack(pady=10)
+        if self.live_quote:
+            # Any edit (typing, paste, reset) or service change re-quotes
+            weight_var.trace_add("write", lambda *args: self.schedule_quote())
+            self.service_dropdown.bind("<<ComboboxSelected>>", lambda event: self.schedule_quote())
+        else:
+            # Calculate button
+            calculate_button = tk.Button(new_order_frame, text="Calculate Price", command=self.calculate_price,
+                                       bg=self.button_color, fg="white")
+            calculate_button.pack(pady=10)
 
         # Price display
         self.price_label = tk.Label(new_order_frame, text="Total Price: RM0.00", bg=self.bg_color, fg=self.text_color)
         self.price_label.pack(pady=5)
 
         # Submit order button
-        submit_button = tk.Button(new_order_frame, text="Submit Order", command=self.submit_order,
-                                 bg=self.button_color, fg="white")
-        submit_button.pack(pady=10)
+        self.submit_button = tk.Button(new_order_frame, text="Submit Order", command=self.submit_order,
+                                       bg=self.button_color, fg="white")
+        self.submit_button.pack(pady=10)
 
         # My Orders tab
         my_orders_frame = tk.Frame(notebook, bg=self.bg_color)
@@ -454,110 +817,410 @@ class LaundryManagementSystem:
                                 bg="red", fg="white")
         logout_button.pack(pady=10)
 
-        # Load initial data
-        self.refresh_my_orders()
+        # Status and payment changes show up without pressing Refresh
+        self.subscribe_changes("laundry_orders", lambda ids: self.refresh_my_orders(full=ids is None))
+        self.subscribe_changes("services", lambda ids: self.order_service.catalog.invalidate())
+
+    def enter_customer_dashboard(self):
+        self.customer_title_label.config(text=f"Customer Dashboard - Welcome {self.current_user['username']}")
+        self.customer_notebook.select(0)
+
+        # Load services; the cached catalog is dropped only if some process
+        # changed services since it was loaded, and the dropdown keeps its
+        # values when nothing changed
+        self.sync_tree("catalog", "services", self.fetch_services, self.show_service_choices,
+                       lambda service_ids: self.fetch_services(),
+                       lambda service_ids, services: self.show_service_choices(services))
+
+        # Empty form and this customer's orders only. The previous customer's
+        # rows and countdowns go now, not when the reload lands.
+        self.service_var.set("")
+        self.weight_entry.delete(0, tk.END)
+        self.price_label.config(text="Total Price: RM0.00")
+        # A previous customer's order still in flight left it disabled
+        self.submit_button.config(state=tk.NORMAL)
+        self.reload_my_orders([])
+        self.refresh_my_orders(full=True)
+
+        self.countdown_after = self.root.after(COUNTDOWN_INTERVAL, self.tick_countdowns)
+
+    def show_service_choices(self, services):
+        self.services = {f"{s.name} (RM{s.price_per_kg}/kg, {s.estimated_time_hours} hrs)": s.id for s in services}
+        self.service_dropdown['values'] = list(self.services.keys())
 
-    def refresh_orders(self):
-        # Clear existing data
-        for item in self.orders_tree.get_children():
-            self.orders_tree.delete(item)
-
-        # Fetch and display orders
-        self.cursor.execute('''
-            SELECT o.id, u.username, o.order_date, o.pickup_date, o.status, o.weight,
-                   o.total_price, o.payment_method, o.payment_status
-            FROM laundry_orders o
-            JOIN users u ON o.user_id = u.id
-            ORDER BY o.order_date DESC
-        ''')
-
-        for order in self.cursor.fetchall():
-            pickup_date = order[3] if order[3] else "Not set"
-            payment_method = order[7] if order[7] else "Not selected"
-            payment_status = order[8] if order[8] else "Pending"
-
-            self.orders_tree.insert("", tk.END, values=(
-                order[0], order[1], order[2], pickup_date, order[4],
-                order[5], f"RM{order[6]:.2f}", payment_method, payment_status
-            ))
-
-    def refresh_services(self):
-        # Clear existing data
-        for item in self.services_tree.get_children():
-            self.services_tree.delete(item)
+    def sync_tree(self, name, table_name, fetch_all, reload, fetch_changes, apply_changes):
+        # Shared driver for the refresh_* methods: full reload on first use or
+        # when the change log cannot cover the gap, otherwise apply the delta.
+        # The fetch_* queries run on the task runner and only reload() or
+        # apply_changes() touch the tree; a newer refresh of the same tree
+        # supersedes one still in flight.
+        watermark = self.sync_watermarks.get(name) if self.incremental_refresh else None
+
+        def fetch():
+            if watermark is not None:
+                current, ids = self.change_feed.changed_ids(table_name, watermark)
+                if ids is not None:
+                    return current, ids, fetch_changes(ids) if ids else None
+            return self.change_feed.current_watermark(), None, fetch_all()
+
+        def show(result):
+            current, ids, rows = result
+            self.sync_watermarks[name] = current
+            if ids is None:
+                reload(rows)
+            elif ids:
+                apply_changes(ids, rows)
+
+        self.tasks.submit(fetch, callback=show, key=name)
+
+    def tree_insert_index(self, tree, key, date_column):
+        # Position for a new row in a tree sorted by (order date, id) descending
+        for index, item in enumerate(tree.get_children()):
+            values = tree.item(item)['values']
+            if (str(values[date_column]), int(values[0])) < key:
+                return index
+        return tk.END
+
+    def format_order_row(self, order):
+        pickup_date = order.pickup_date if order.pickup_date else "Not set"
+        payment_method = order.payment_method if order.payment_method else "Not selected"
+        payment_status = order.payment_status if order.payment_status else "Pending"
+
+        return (
+            order.id, order.customer, order.order_date, pickup_date, order.status,
+            order.weight, f"RM{order.total_price:.2f}", payment_method, payment_status
+        )
+
+    def refresh_orders(self, full=False):
+        # A filtered view re-reads only the changed orders, with the filter
+        # applied; those that no longer match drop out of the tree
+        if full:
+            self.sync_watermarks.pop("orders", None)
+        order_filter = self.orders_filter
+        if order_filter is None:
+            fetch_changes = self.order_service.orders_by_id
+        else:
+            fetch_changes = lambda order_ids: self.order_service.search_orders_by_id(order_filter, order_ids)
+        self.sync_tree("orders", "laundry_orders", lambda: self.fetch_orders_page(order_filter, None),
+                       self.reload_orders, fetch_changes, self.apply_order_changes)
+
+    def fetch_orders_page(self, order_filter, after):
+        # Keyset pagination on (order_date, id) so every page costs the same
+        # regardless of how far the user has scrolled; runs on the task runner
+        if order_filter is None:
+            return self.order_service.list_orders(self.orders_page_size, after)
+        return self.order_service.search_orders(order_filter, self.orders_page_size, after)
+
+    def reload_orders(self, orders):
+        # Clear existing data and start again from the newest page, keeping
+        # whichever selected orders are still on it for bulk status updates
+        selected = self.orders_tree.selection()
+        self.tasks.cancel("orders_page")
+        self.orders_tree.delete(*self.orders_tree.get_children())
+        self.orders_last_key = None
+        self.orders_exhausted = False
+
+        self.show_orders_page(orders)
+        self.orders_tree.selection_set([iid for iid in selected if self.orders_tree.exists(iid)])
+
+    def load_more_orders(self):
+        if self.orders_exhausted:
+            self.orders_loading = False
+            return
 
-        # Fetch and display services
-        self.cursor.execute("SELECT id, name, price_per_kg, description, estimated_time_hours FROM services")
+        order_filter = self.orders_filter
+        after = self.orders_last_key
 
-        for service in self.cursor.fetchall():
-            self.services_tree.insert("", tk.END, values=service)
+        def show_page(orders):
+            # A reload since the request went out makes this page stale
+            if after == self.orders_last_key and order_filter == self.orders_filter:
+                self.show_orders_page(orders)
 
-    def refresh_users(self):
-        # Clear existing data
-        for item in self.users_tree.get_children():
-            self.users_tree.delete(item)
+        self.tasks.submit(self.fetch_orders_page, order_filter, after, callback=show_page, key="orders_page")
+
+    def show_orders_page(self, orders):
+        self.orders_loading = False
+        if len(orders) < self.orders_page_size:
+            self.orders_exhausted = True
+        if orders:
+            self.orders_last_key = (orders[-1].order_date, orders[-1].id)
+
+        for order in orders:
+            self.orders_tree.insert("", tk.END, iid=str(order.id), values=self.format_order_row(order))
+
+    def apply_orders_filter(self):
+        order_id = self.filter_id_entry.get().strip().lstrip("#")
+        date_from = self.filter_from_entry.get().strip()
+        date_to = self.filter_to_entry.get().strip()
+
+        if order_id and not order_id.isdigit():
+            messagebox.showerror("Error", "Order ID must be a number")
+            return
+        try:
+            for date_text in (date_from, date_to):
+                if date_text:
+                    datetime.strptime(date_text, "%Y-%m-%d")
+        except ValueError:
+            messagebox.showerror("Error", "Please enter dates as YYYY-MM-DD")
+            return
+
+        order_filter = OrderFilter(
+            order_id=int(order_id) if order_id else None,
+            customer=self.filter_customer_entry.get().strip() or None,
+            status=self.filter_status_var.get() or None,
+            payment_status=self.filter_payment_var.get() or None,
+            date_from=date_from or None,
+            date_to=date_to or None,
+        )
+        self.orders_filter = order_filter if any(order_filter) else None
+        self.refresh_orders(full=True)
+
+    def clear_orders_filter(self):
+        for entry in (self.filter_id_entry, self.filter_customer_entry, self.filter_from_entry, self.filter_to_entry):
+            entry.delete(0, tk.END)
+        self.filter_status_var.set("")
+        self.filter_payment_var.set("")
+
+        self.orders_filter = None
+        self.refresh_orders(full=True)
+
+    def on_orders_scroll(self, scrollbar, first, last):
+        scrollbar.set(first, last)
+
+        # Fetch the next page once the view nears the bottom of what is loaded,
+        # unless a reload is on its way anyway
+        if float(last) >= 0.95 and not self.orders_exhausted and not self.orders_loading \
+                and not self.tasks.busy("orders"):
+            self.orders_loading = True
+            self.root.after_idle(self.load_more_orders)
+
+    def apply_order_changes(self, order_ids, orders):
+        for order in orders:
+            self.paint_order_row(order)
+
+        # Orders that no longer exist or no longer match the filter
+        for order_id in set(order_ids) - {order.id for order in orders}:
+            if self.orders_tree.exists(str(order_id)):
+                self.orders_tree.delete(str(order_id))
+
+    def paint_order_row(self, order):
+        iid = str(order.id)
+        if self.orders_tree.exists(iid):
+            self.orders_tree.item(iid, values=self.format_order_row(order))
+            return
+
+        # Only insert rows inside the loaded window; older ones arrive on scroll
+        key = (order.order_date, order.id)
+        if not self.orders_exhausted and self.orders_last_key is not None and key < self.orders_last_key:
+            return
 
-        # Fetch and display users
-        self.cursor.execute("SELECT id, username, email, phone, is_admin, created_at FROM users")
+        self.orders_tree.insert("", self.tree_insert_index(self.orders_tree, key, 2),
+                                iid=iid, values=self.format_order_row(order))
 
-        for user in self.cursor.fetchall():
-            admin_status = "Yes" if user[4] else "No"
-            self.users_tree.insert("", tk.END, values=user[:4] + (admin_status,) + (user[5],))
+    def refresh_services(self, full=False):
+        if full:
+            self.sync_watermarks.pop("services", None)
+        self.sync_tree("services", "services", self.fetch_services, self.reload_services,
+                       self.fetch_changed_services, self.apply_service_changes)
 
-    def refresh_my_orders(self):
+    def fetch_services(self):
+        # Straight from the database; the cached catalog is reloaded with it
+        self.order_service.catalog.invalidate()
+        return self.order_service.list_services()
+
+    def fetch_changed_services(self, service_ids):
+        # Changes may come from another process, so the cached catalog goes too
+        self.order_service.catalog.invalidate()
+        return self.order_service.services_by_id(service_ids)
+
+    def reload_services(self, services):
         # Clear existing data
-        for item in self.my_orders_tree.get_children():
-            self.my_orders_tree.delete(item)
+        self.services_tree.delete(*self.services_tree.get_children())
 
-        # Update columns to include payment method
-        columns = ("ID", "Order Date", "Pickup Date", "Status", "Weight", "Price", "Payment Method", "Payment Status", "Remaining Time")
-        self.my_orders_tree['columns'] = columns
-        for col in columns:
-            self.my_orders_tree.heading(col, text=col)
+        for service in services:
+            self.services_tree.insert("", tk.END, iid=str(service.id), values=service)
 
-        # Fetch and display orders for current user
-        self.cursor.execute('''
-            SELECT id, order_date, pickup_date, status, weight, total_price,
-                   payment_method, payment_status
-            FROM laundry_orders
-            WHERE user_id = ?
-            ORDER BY order_date DESC
-        ''', (self.current_user['id'],))
-
-        for order in self.cursor.fetchall():
-            # Calculate remaining time
+    def apply_service_changes(self, service_ids, services):
+        for service in services:
+            if self.services_tree.exists(str(service.id)):
+                self.services_tree.item(str(service.id), values=service)
+            else:
+                self.services_tree.insert("", tk.END, iid=str(service.id), values=service)
+
+        for service_id in set(service_ids) - {service.id for service in services}:
+            if self.services_tree.exists(str(service_id)):
+                self.services_tree.delete(str(service_id))
+
+    def refresh_statistics(self):
+        days = STATS_PERIODS.get(self.stats_period_var.get())
+        self.tasks.submit(self.fetch_statistics, days, callback=self.show_statistics, key="statistics")
+
+    def fetch_statistics(self, days):
+        # (by status, by payment status, backlog, by service, by day); runs on
+        # the task runner
+        by_status = self.order_service.order_stats("status", days)
+        by_payment = self.order_service.order_stats("payment_status", days)
+        # Backlog is everything not finished yet, whenever it was ordered
+        backlog = sum(row.orders for row in self.order_service.order_stats("status")
+                      if row.key not in ("Completed", "Cancelled"))
+        return (by_status, by_payment, backlog,
+                self.order_service.order_stats("service", days), self.order_service.order_stats("day", days))
+
+    def show_statistics(self, stats):
+        by_status, by_payment, backlog, by_service, by_day = stats
+        by_payment = {row.key: row for row in by_payment}
+
+        orders = sum(row.orders for row in by_status)
+        weight = sum(row.weight for row in by_status)
+        revenue = sum(row.revenue for row in by_status)
+        paid = by_payment["Paid"].revenue if "Paid" in by_payment else 0.0
+        self.stats_summary_label.config(
+            text=f"Orders: {orders}    Weight: {weight:.1f} kg    Revenue: RM{revenue:.2f}    "
+                 f"Paid: RM{paid:.2f}    Backlog: {backlog} orders")
+
+        self.stats_tree.delete(*self.stats_tree.get_children())
+        sections = (
+            ("By service", by_service),
+            ("By status", by_status),
+            ("By payment status", list(by_payment.values())),
+            ("By day", by_day),
+        )
+        for title, rows in sections:
+            section = self.stats_tree.insert("", tk.END, text=title, open=title != "By day")
+            for row in rows:
+                self.stats_tree.insert(section, tk.END, text=row.key,
+                                       values=(row.orders, f"{row.weight:.1f}", f"RM{row.revenue:.2f}"))
+
+    def refresh_users(self, full=False):
+        if full:
+            self.sync_watermarks.pop("users", None)
+        self.sync_tree("users", "users", lambda: self.db.fetchall(USERS_QUERY), self.reload_users,
+                       self.fetch_changed_users, self.apply_user_changes)
+
+    def format_user_row(self, user):
+        admin_status = "Yes" if user[4] else "No"
+        return user[:4] + (admin_status,) + (user[5],)
+
+    def reload_users(self, users):
+        # Clear existing data
+        self.users_tree.delete(*self.users_tree.get_children())
+
+        for user in users:
+            self.users_tree.insert("", tk.END, iid=str(user[0]), values=self.format_user_row(user))
+
+    def fetch_changed_users(self, user_ids):
+        return fetch_by_ids(self.db, '''
+            SELECT id, username, email, phone, is_admin, created_at
+            FROM users
+            WHERE id IN ({ids})
+        ''', user_ids)
+
+    def apply_user_changes(self, user_ids, users):
+        for user in users:
+            if self.users_tree.exists(str(user[0])):
+                self.users_tree.item(str(user[0]), values=self.format_user_row(user))
+            else:
+                self.users_tree.insert("", tk.END, iid=str(user[0]), values=self.format_user_row(user))
+
+        for user_id in set(user_ids) - {user[0] for user in users}:
+            if self.users_tree.exists(str(user_id)):
+                self.users_tree.delete(str(user_id))
+
+    def format_remaining(self, seconds):
+        # Same layout as str(timedelta) without the microseconds
+        if seconds <= 0:
+            return "Ready for pickup"
+        days, seconds = divmod(seconds, 86400)
+        hours, seconds = divmod(seconds, 3600)
+        minutes, seconds = divmod(seconds, 60)
+        clock = f"{hours}:{minutes:02d}:{seconds:02d}"
+        if days:
+            return f"{days} day{'s' if days != 1 else ''}, {clock}"
+        return clock
+
+    def format_my_order_row(self, order):
+        # Remaining time from the epoch pickup time; the ticker keeps it current
+        if order.countdown_ts is not None:
+            self.countdowns[str(order.id)] = order.countdown_ts
+            remaining_time = self.format_remaining(order.countdown_ts - int(time.time()))
+        else:
+            self.countdowns.pop(str(order.id), None)
             remaining_time = "N/A"
-            if order[2] and order[3] not in ('Completed', 'Cancelled'):
-                pickup_date = datetime.strptime(order[2], "%Y-%m-%d %H:%M:%S")
-                remaining_time = pickup_date - datetime.now()
-                if remaining_time.total_seconds() > 0:
-                    remaining_time = str(remaining_time).split(".")[0]
-                else:
-                    remaining_time = "Ready for pickup"
-
-            pickup_date = order[2] if order[2] else "Not set"
-            payment_method = order[6] if order[6] else "Not selected"
-            payment_status = order[7] if order[7] else "Pending"
-
-            self.my_orders_tree.insert("", tk.END, values=(
-                order[0],
-                order[1],
-                pickup_date,
-                order[3],
-                order[4],
-                f"RM{order[5]:.2f}",
-                payment_method,
-                payment_status,
-                remaining_time
-            ))
+
+        pickup_date = order.pickup_date if order.pickup_date else "Not set"
+        payment_method = order.payment_method if order.payment_method else "Not selected"
+        payment_status = order.payment_status if order.payment_status else "Pending"
+
+        return (
+            order.id,
+            order.order_date,
+            pickup_date,
+            order.status,
+            order.weight,
+            f"RM{order.total_price:.2f}",
+            payment_method,
+            payment_status,
+            remaining_time
+        )
+
+    def refresh_my_orders(self, full=False):
+        if full:
+            self.sync_watermarks.pop("my_orders", None)
+        user_id = self.current_user['id']
+        self.sync_tree("my_orders", "laundry_orders", lambda: self.order_service.list_customer_orders(user_id),
+                       self.reload_my_orders,
+                       lambda order_ids: self.order_service.customer_orders_by_id(user_id, order_ids),
+                       self.apply_my_order_changes)
+
+    def reload_my_orders(self, orders):
+        # Clear existing data
+        self.my_orders_tree.delete(*self.my_orders_tree.get_children())
+        self.countdowns = {}
+
+        for order in orders:
+            self.my_orders_tree.insert("", tk.END, iid=str(order.id), values=self.format_my_order_row(order))
+
+    def apply_my_order_changes(self, order_ids, orders):
+        for order in orders:
+            iid = str(order.id)
+            if self.my_orders_tree.exists(iid):
+                self.my_orders_tree.item(iid, values=self.format_my_order_row(order))
+            else:
+                index = self.tree_insert_index(self.my_orders_tree, (order.order_date, order.id), 1)
+                self.my_orders_tree.insert("", index, iid=iid, values=self.format_my_order_row(order))
+
+        for order_id in set(order_ids) - {order.id for order in orders}:
+            self.countdowns.pop(str(order_id), None)
+            if self.my_orders_tree.exists(str(order_id)):
+                self.my_orders_tree.delete(str(order_id))
+
+    def tick_countdowns(self):
+        # Once a second, rewrite only the Remaining Time cells of open orders;
+        # no query, and the loop ends with the customer dashboard
+        self.countdown_after = None
+        if not self.my_orders_tree.winfo_exists():
+            return
+
+        now = int(time.time())
+        for iid, countdown_ts in list(self.countdowns.items()):
+            if not self.my_orders_tree.exists(iid):
+                del self.countdowns[iid]
+                continue
+            self.my_orders_tree.set(iid, "Remaining Time", self.format_remaining(countdown_ts - now))
+            if countdown_ts <= now:
+                del self.countdowns[iid]
+
+        self.countdown_after = self.root.after(COUNTDOWN_INTERVAL, self.tick_countdowns)
 
     def update_order_status(self):
-        selected_item = self.orders_tree.selection()
-        if not selected_item:
+        # Works on every selected row, so a finished machine load can be moved
+        # in one go
+        selected_items = self.orders_tree.selection()
+        if not selected_items:
             messagebox.showerror("Error", "Please select an order to update")
             return
 
-        order_id = self.orders_tree.item(selected_item)['values'][0]
+        order_ids = [int(item) for item in selected_items]
 
         # Create dialog
         dialog = tk.Toplevel(self.root)
@@ -565,13 +1228,18 @@ class LaundryManagementSystem:
         dialog.geometry("300x200")
 
         # Current status
-        current_status = self.orders_tree.item(selected_item)['values'][4]
-        tk.Label(dialog, text=f"Current Status: {current_status}").pack(pady=10)
+        current_statuses = {self.orders_tree.item(item)['values'][4] for item in selected_items}
+        current_status = current_statuses.pop() if len(current_statuses) == 1 else ""
+        if len(order_ids) == 1:
+            tk.Label(dialog, text=f"Current Status: {current_status}").pack(pady=10)
+        else:
+            tk.Label(dialog, text=f"{len(order_ids)} orders selected, "
+                                  f"Current Status: {current_status or 'Mixed'}").pack(pady=10)
 
         # New status
         tk.Label(dialog, text="New Status:").pack()
         status_var = tk.StringVar(value=current_status)
-        status_options = ["Pending", "Processing", "Ready for Pickup", "Completed", "Cancelled"]
+        status_options = list(ORDER_STATUSES)
         status_dropdown = ttk.Combobox(dialog, textvariable=status_var, values=status_options, state="readonly")
         status_dropdown.pack(pady=10)
 
@@ -588,18 +1256,24 @@ class LaundryManagementSystem:
             new_status = status_var.get()
             pickup_date = pickup_date_entry.get() if new_status == "Ready for Pickup" else None
 
-            try:
-                self.cursor.execute('''
-                    UPDATE laundry_orders
-                    SET status = ?, pickup_date = ?
-                    WHERE id = ?
-                ''', (new_status, pickup_date, order_id))
-                self.conn.commit()
-                messagebox.showinfo("Success", "Order status updated successfully")
+            if not new_status:
+                messagebox.showerror("Error", "Please select a status")
+                return
+
+            def updated(count):
+                # The incremental refresh repaints just the affected rows
                 self.refresh_orders()
-                dialog.destroy()
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to update order status: {str(e)}")
+                if dialog.winfo_exists():
+                    dialog.destroy()
+                if count == 1:
+                    messagebox.showinfo("Success", "Order status updated successfully")
+                else:
+                    messagebox.showinfo("Success", f"{count} orders updated successfully")
+
+            self.tasks.submit(self.order_service.update_statuses, order_ids, new_status, pickup_date,
+                              callback=self.in_session(updated),
+                              error=self.in_session(
+                                  lambda e: messagebox.showerror("Error", f"Failed to update order status: {str(e)}")))
 
         # Update button
         update_button = tk.Button(dialog, text="Update", command=update_status, bg=self.button_color, fg="white")
@@ -632,23 +1306,22 @@ class LaundryManagementSystem:
 
         def add_service():
             try:
-                self.cursor.execute('''
-                    INSERT INTO services (name, price_per_kg, description, estimated_time_hours)
-                    VALUES (?, ?, ?, ?)
-                ''', (
-                    name_entry.get(),
-                    float(price_entry.get()),
-                    desc_entry.get(),
-                    int(time_entry.get())
-                ))
-                self.conn.commit()
-                messagebox.showinfo("Success", "Service added successfully")
-                self.refresh_services()
-                dialog.destroy()
+                price = float(price_entry.get())
+                hours = int(time_entry.get())
             except ValueError:
                 messagebox.showerror("Error", "Please enter valid numbers for price and time")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to add service: {str(e)}")
+                return
+
+            def added(service_id):
+                messagebox.showinfo("Success", "Service added successfully")
+                self.refresh_services()
+                if dialog.winfo_exists():
+                    dialog.destroy()
+
+            self.tasks.submit(self.order_service.add_service, name_entry.get(), price, desc_entry.get(), hours,
+                              callback=self.in_session(added),
+                              error=self.in_session(
+                                  lambda e: messagebox.showerror("Error", f"Failed to add service: {str(e)}")))
 
         # Add button
         add_button = tk.Button(dialog, text="Add Service", command=add_service, bg=self.button_color, fg="white")
@@ -662,14 +1335,12 @@ class LaundryManagementSystem:
 
         service_id = self.services_tree.item(selected_item)['values'][0]
 
-        # Fetch service details
-        self.cursor.execute('''
-            SELECT name, price_per_kg, description, estimated_time_hours
-            FROM services
-            WHERE id = ?
-        ''', (service_id,))
-        service = self.cursor.fetchone()
+        # Fetch service details, then open the dialog
+        self.tasks.submit(self.order_service.get_service, service_id,
+                          callback=lambda service: self.show_edit_service_form(service_id, service),
+                          error=lambda e: messagebox.showerror("Error", f"Failed to load service: {str(e)}"))
 
+    def show_edit_service_form(self, service_id, service):
         # Create dialog
         dialog = tk.Toplevel(self.root)
         dialog.title("Edit Service")
@@ -678,48 +1349,45 @@ class LaundryManagementSystem:
         # Name
         tk.Label(dialog, text="Service Name:").pack(pady=5)
         name_entry = tk.Entry(dialog, width=30)
-        name_entry.insert(0, service[0])
+        name_entry.insert(0, service.name)
         name_entry.pack(pady=5)
 
         # Price
         tk.Label(dialog, text="Price per kg (RM):").pack(pady=5)
         price_entry = tk.Entry(dialog, width=30)
-        price_entry.insert(0, service[1])
+        price_entry.insert(0, service.price_per_kg)
         price_entry.pack(pady=5)
 
         # Description
         tk.Label(dialog, text="Description:").pack(pady=5)
         desc_entry = tk.Entry(dialog, width=30)
-        desc_entry.insert(0, service[2])
+        desc_entry.insert(0, service.description)
         desc_entry.pack(pady=5)
 
         # Estimated time
         tk.Label(dialog, text="Estimated Time (hours):").pack(pady=5)
         time_entry = tk.Entry(dialog, width=30)
-        time_entry.insert(0, service[3])
+        time_entry.insert(0, service.estimated_time_hours)
         time_entry.pack(pady=5)
 
         def update_service():
             try:
-                self.cursor.execute('''
-                    UPDATE services
-                    SET name = ?, price_per_kg = ?, description = ?, estimated_time_hours = ?
-                    WHERE id = ?
-                ''', (
-                    name_entry.get(),
-                    float(price_entry.get()),
-                    desc_entry.get(),
-                    int(time_entry.get()),
-                    service_id
-                ))
-                self.conn.commit()
-                messagebox.showinfo("Success", "Service updated successfully")
-                self.refresh_services()
-                dialog.destroy()
+                price = float(price_entry.get())
+                hours = int(time_entry.get())
             except ValueError:
                 messagebox.showerror("Error", "Please enter valid numbers for price and time")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to update service: {str(e)}")
+                return
+
+            def updated(result):
+                messagebox.showinfo("Success", "Service updated successfully")
+                self.refresh_services()
+                if dialog.winfo_exists():
+                    dialog.destroy()
+
+            self.tasks.submit(self.order_service.update_service, service_id, name_entry.get(), price,
+                              desc_entry.get(), hours, callback=self.in_session(updated),
+                              error=self.in_session(
+                                  lambda e: messagebox.showerror("Error", f"Failed to update service: {str(e)}")))
 
         # Update button
         update_button = tk.Button(dialog, text="Update Service", command=update_service, bg=self.button_color, fg="white")
@@ -734,14 +1402,14 @@ class LaundryManagementSystem:
         service_id = self.services_tree.item(selected_item)['values'][0]
         service_name = self.services_tree.item(selected_item)['values'][1]
 
+        def deleted(result):
+            messagebox.showinfo("Success", "Service deleted successfully")
+            self.refresh_services()
+
         if messagebox.askyesno("Confirm", f"Are you sure you want to delete '{service_name}'?"):
-            try:
-                self.cursor.execute("DELETE FROM services WHERE id = ?", (service_id,))
-                self.conn.commit()
-                messagebox.showinfo("Success", "Service deleted successfully")
-                self.refresh_services()
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to delete service: {str(e)}")
+            self.tasks.submit(self.order_service.delete_service, service_id, callback=self.in_session(deleted),
+                              error=self.in_session(
+                                  lambda e: messagebox.showerror("Error", f"Failed to delete service: {str(e)}")))
 
     def calculate_price(self):
         selected_service = self.service_var.get()
@@ -753,87 +1421,93 @@ class LaundryManagementSystem:
 
         try:
             weight = float(weight_text)
-            if weight <= 0:
-                raise ValueError("Weight must be positive")
-
-            service_id = self.services[selected_service]
-            self.cursor.execute("SELECT price_per_kg FROM services WHERE id = ?", (service_id,))
-            price_per_kg = self.cursor.fetchone()[0]
-
-            total_price = weight * price_per_kg
-            self.price_label.config(text=f"Total Price: RM{total_price:.2f}")
         except ValueError:
             messagebox.showerror("Error", "Please enter a valid weight (positive number)")
+            return
+
+        def failed(e):
+            if isinstance(e, OrderServiceError):
+                messagebox.showerror("Error", "Please enter a valid weight (positive number)")
+            else:
+                messagebox.showerror("Error", f"Failed to calculate price: {str(e)}")
+
+        self.tasks.submit(self.order_service.quote, self.services[selected_service], weight,
+                          callback=self.show_quote, error=failed, key="quote")
+
+    def schedule_quote(self):
+        # Debounce: only the last edit in a burst of keystrokes gets quoted
+        if self.quote_after is not None:
+            self.root.after_cancel(self.quote_after)
+        self.quote_after = self.root.after(QUOTE_DEBOUNCE_MS, self.update_live_quote)
+
+    def update_live_quote(self):
+        self.quote_after = None
+        if not self.price_label.winfo_exists():
+            return
+
+        # Priced from the cached catalog; half-typed input just shows zero
+        try:
+            service_id = self.services[self.service_var.get()]
+            weight = float(self.weight_entry.get())
+        except (KeyError, ValueError):
+            self.price_label.config(text="Total Price: RM0.00")
+            return
+
+        self.tasks.submit(self.order_service.quote, service_id, weight, callback=self.show_quote,
+                          error=lambda e: self.price_label.config(text="Total Price: RM0.00"), key="quote")
+
+    def show_quote(self, quote):
+        self.price_label.config(text=f"Total Price: RM{quote.total_price:.2f}")
 
     def submit_order(self):
         selected_service = self.service_var.get()
         weight_text = self.weight_entry.get()
-        price_text = self.price_label.cget("text").replace("Total Price: RM", "")
 
-        if not selected_service or not weight_text or price_text == "0.00":
-            messagebox.showerror("Error", "Please calculate the price first")
+        if not selected_service or not weight_text:
+            messagebox.showerror("Error", "Please select a service and enter weight")
             return
 
         try:
             weight = float(weight_text)
-            total_price = float(price_text)
-            service_id = self.services[selected_service]
-
-            # Get estimated time for the service
-            self.cursor.execute("SELECT estimated_time_hours FROM services WHERE id = ?", (service_id,))
-            estimated_hours = self.cursor.fetchone()[0]
-            pickup_date = datetime.now() + timedelta(hours=estimated_hours)
-
-            # Generate QR code with detailed receipt information
-            receipt_info = (
-                f"Laundry Service Receipt\n"
-                f"Order ID: {self.cursor.lastrowid + 1}\n"  # Estimate next ID
-                f"Customer: {self.current_user['username']}\n"
-                f"Service: {selected_service.split(' (')[0]}\n"
-                f"Weight: {weight} kg\n"
-                f"Amount: RM{total_price:.2f}\n"
-                f"Pickup Date: {pickup_date.strftime('%Y-%m-%d %H:%M')}\n"
-                f"Status: Pending"
-            )
-
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=4,
-            )
-            qr.add_data(receipt_info)
-            qr.make(fit=True)
-
-            qr_img = qr.make_image(fill_color="black", back_color="white")
-            img_byte_arr = BytesIO()
-            qr_img.save(img_byte_arr, format='PNG')
-            qr_bytes = img_byte_arr.getvalue()
-
-            # Insert order with NULL payment_method (to be selected in payment dialog)
-            self.cursor.execute('''
-                INSERT INTO laundry_orders
-                (user_id, service_id, pickup_date, weight, total_price, payment_method, payment_status, qr_code)
-                VALUES (?, ?, ?, ?, ?, NULL, 'Pending', ?)
-            ''', (
-                self.current_user['id'],
-                service_id,
-                pickup_date.strftime("%Y-%m-%d %H:%M:%S"),
-                weight,
-                total_price,
-                qr_bytes
-            ))
-            self.conn.commit()
-
-            messagebox.showinfo("Success", "Order submitted successfully! Please proceed to payment.")
+        except ValueError:
+            messagebox.showerror("Error", "Please enter a valid weight (positive number)")
+            return
+
+        session = self.session
+
+        def submitted(order):
+            # The PNG, if kept at all, is rendered and attached in the
+            # background, even if the customer has logged out meanwhile
+            if self.store_qr_png:
+                self.tasks.submit(render_qr_png, order.receipt_info,
+                                  callback=lambda qr_bytes: self.tasks.submit(self.order_service.attach_qr,
+                                                                              order.id, qr_bytes))
+            if self.session != session:
+                return
+
+            self.submit_button.config(state=tk.NORMAL)
+            messagebox.showinfo("Success", f"Order submitted successfully! Total: RM{order.total_price:.2f}\n"
+                                           "Please proceed to payment.")
             self.refresh_my_orders()
 
             # Reset form
             self.service_var.set("")
             self.weight_entry.delete(0, tk.END)
             self.price_label.config(text="Total Price: RM0.00")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to submit order: {str(e)}")
+
+        def failed(e):
+            self.submit_button.config(state=tk.NORMAL)
+            if isinstance(e, OrderServiceError):
+                messagebox.showerror("Error", str(e))
+            else:
+                messagebox.showerror("Error", f"Failed to submit order: {str(e)}")
+
+        # The service layer prices the order itself; the label is display only.
+        # The button stays disabled until the order is in, so a second click
+        # cannot place it twice.
+        self.submit_button.config(state=tk.DISABLED)
+        self.tasks.submit(self.order_service.create_order, self.current_user['id'], self.current_user['username'],
+                          self.services[selected_service], weight, callback=submitted, error=self.in_session(failed))
 
     def initiate_payment_process(self):
         selected_item = self.my_orders_tree.selection()
@@ -883,21 +1557,16 @@ class LaundryManagementSystem:
         if not messagebox.askyesno("Confirm", "You selected Cash Payment. You will pay when picking up.\n\nContinue?"):
             return
 
-        try:
-            # Update payment method and status
-            self.cursor.execute('''
-                UPDATE laundry_orders
-                SET payment_method = 'Cash',
-                    payment_status = 'Pending'
-                WHERE id = ?
-            ''', (order_id,))
-            self.conn.commit()
-
+        def chosen(result):
             messagebox.showinfo("Success", "Cash payment selected. Please pay when picking up your laundry.")
-            dialog.destroy()
+            if dialog.winfo_exists():
+                dialog.destroy()
             self.refresh_my_orders()
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to process payment: {str(e)}")
+
+        # Update payment method and status
+        self.tasks.submit(self.order_service.choose_cash_payment, order_id, callback=self.in_session(chosen),
+                          error=self.in_session(
+                              lambda e: messagebox.showerror("Error", f"Failed to process payment: {str(e)}")))
 
     def process_online_payment(self, dialog, order_id, total_price):
         # Confirm selection
@@ -924,38 +1593,34 @@ class LaundryManagementSystem:
         qr_frame = tk.Frame(payment_dialog)
         qr_frame.pack(pady=10)
 
-        # Generate QR code with payment info
-        payment_info = f"Bank Transfer\nOrder: {order_id}\nAmount: RM{total_price:.2f}\nRef: ORDER{order_id}"
-        qr = qrcode.QRCode(version=1, box_size=8, border=4)
-        qr.add_data(payment_info)
-        qr.make(fit=True)
+        # Generate QR code with payment info in the background
+        qr_label = tk.Label(qr_frame, text="Generating QR code...")
+        qr_label.pack()
 
-        qr_img = qr.make_image(fill_color="black", back_color="white")
-        qr_img = qr_img.resize((200, 200), Image.Resampling.LANCZOS)
+        def show_payment_qr(qr_img):
+            if not qr_label.winfo_exists():
+                return
+            from PIL import ImageTk
+            self.qr_photo = ImageTk.PhotoImage(qr_img)
+            qr_label.config(image=self.qr_photo, text="")
 
-        self.qr_photo = ImageTk.PhotoImage(qr_img)
-        qr_label = tk.Label(qr_frame, image=self.qr_photo)
-        qr_label.pack()
+        payment_info = f"Bank Transfer\nOrder: {order_id}\nAmount: RM{total_price:.2f}\nRef: ORDER{order_id}"
+        self.tasks.submit(render_qr_image, payment_info, 200, callback=show_payment_qr)
 
         # Confirm payment button
+        def paid(result):
+            # Show receipt after payment
+            messagebox.showinfo("Success", "Payment confirmed! Please bring your receipt when picking up.")
+            for window in (payment_dialog, dialog):
+                if window.winfo_exists():
+                    window.destroy()
+            self.refresh_my_orders()
+            self.show_receipt(order_id)
+
         def confirm_payment():
-            try:
-                self.cursor.execute('''
-                    UPDATE laundry_orders
-                    SET payment_method = 'Online Transfer',
-                        payment_status = 'Paid'
-                    WHERE id = ?
-                ''', (order_id,))
-                self.conn.commit()
-
-                # Show receipt after payment
-                messagebox.showinfo("Success", "Payment confirmed! Please bring your receipt when picking up.")
-                payment_dialog.destroy()
-                dialog.destroy()
-                self.refresh_my_orders()
-                self.show_receipt(order_id)
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to confirm payment: {str(e)}")
+            self.tasks.submit(self.order_service.mark_paid, order_id, "Online Transfer", callback=self.in_session(paid),
+                              error=self.in_session(
+                                  lambda e: messagebox.showerror("Error", f"Failed to confirm payment: {str(e)}")))
 
         tk.Button(payment_dialog, text="I Have Made the Payment",
                  command=confirm_payment, bg="green", fg="white").pack(pady=20)
@@ -966,9 +1631,63 @@ class LaundryManagementSystem:
             messagebox.showerror("Error", "Please select an order to view receipt")
             return
 
-        order_id = self.orders_tree.item(selected_item)['values'][0]
+        order_id = self.orders_tree.item(selected_item[0])['values'][0]
         self.show_receipt(order_id)
 
+    def show_archive_search_dialog(self):
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Search Archived Orders")
+        dialog.geometry("900x400")
+
+        search_frame = tk.Frame(dialog)
+        search_frame.pack(fill=tk.X, padx=10, pady=10)
+
+        tk.Label(search_frame, text="Order ID or customer:").pack(side=tk.LEFT)
+        search_entry = tk.Entry(search_frame, width=30)
+        search_entry.pack(side=tk.LEFT, padx=5)
+
+        columns = ("ID", "Customer", "Order Date", "Pickup Date", "Status", "Weight", "Price", "Payment Method", "Payment Status")
+        results_tree = ttk.Treeview(dialog, columns=columns, show="headings")
+        for col in columns:
+            results_tree.heading(col, text=col)
+            results_tree.column(col, width=90, anchor=tk.CENTER)
+        results_tree.pack(fill=tk.BOTH, expand=True, padx=10)
+
+        def search():
+            term = search_entry.get().strip()
+            if not term:
+                messagebox.showerror("Error", "Please enter an order ID or customer name", parent=dialog)
+                return
+
+            def show_results(orders):
+                if not dialog.winfo_exists():
+                    return
+                results_tree.delete(*results_tree.get_children())
+                for order in orders:
+                    results_tree.insert("", tk.END, iid=str(order.id), values=self.format_order_row(order))
+                if not orders:
+                    messagebox.showinfo("Search Archive", "No archived orders found", parent=dialog)
+
+            def failed(e):
+                if dialog.winfo_exists():
+                    messagebox.showerror("Error", f"Failed to search archive: {str(e)}", parent=dialog)
+
+            self.tasks.submit(self.order_service.search_archive, term, callback=show_results, error=failed,
+                              key="archive_search")
+
+        def view_receipt():
+            selected_item = results_tree.selection()
+            if not selected_item:
+                messagebox.showerror("Error", "Please select an order to view receipt", parent=dialog)
+                return
+            self.show_receipt(int(selected_item[0]))
+
+        tk.Button(search_frame, text="Search", command=search, bg=self.button_color, fg="white").pack(side=tk.LEFT, padx=5)
+        search_entry.bind("<Return>", lambda event: search())
+
+        tk.Button(dialog, text="View Receipt", command=view_receipt,
+                  bg=self.button_color, fg="white").pack(pady=10)
+
     def view_receipt_as_customer(self):
         selected_item = self.my_orders_tree.selection()
         if not selected_item:
@@ -979,26 +1698,20 @@ class LaundryManagementSystem:
         self.show_receipt(order_id)
 
     def show_receipt(self, order_id):
-        # Fetch order details with service information
-        self.cursor.execute('''
-            SELECT o.id, u.username, s.name, o.weight, o.total_price,
-                   o.order_date, o.pickup_date, o.status, o.payment_status, o.payment_method,
-                   o.qr_code
-            FROM laundry_orders o
-            JOIN users u ON o.user_id = u.id
-            JOIN services s ON o.service_id = s.id
-            WHERE o.id = ?
-        ''', (order_id,))
-
-        order = self.cursor.fetchone()
+        # The store and cache files are read on the task runner too
+        self.tasks.submit(self.order_service.receipt_with_qr, order_id, self.qr_cache,
+                          callback=self.show_receipt_dialog,
+                          error=lambda e: messagebox.showerror("Error", f"Failed to load receipt: {str(e)}"))
 
+    def show_receipt_dialog(self, receipt):
+        order, qr_bytes, receipt_info = receipt
         if not order:
             messagebox.showerror("Error", "Order not found")
             return
 
         # Create receipt dialog
         receipt_dialog = tk.Toplevel(self.root)
-        receipt_dialog.title(f"Receipt for Order #{order[0]}")
+        receipt_dialog.title(f"Receipt for Order #{order.id}")
         receipt_dialog.geometry("500x700")
 
         # Main receipt frame
@@ -1024,17 +1737,17 @@ class LaundryManagementSystem:
         left_frame = tk.Frame(info_frame)
         left_frame.pack(side=tk.LEFT, anchor="w")
 
-        tk.Label(left_frame, text=f"Order ID: #{order[0]}", anchor="w", font=("Arial", 10)).pack(fill=tk.X)
-        tk.Label(left_frame, text=f"Customer: {order[1]}", anchor="w", font=("Arial", 10)).pack(fill=tk.X)
-        tk.Label(left_frame, text=f"Order Date: {order[5]}", anchor="w", font=("Arial", 10)).pack(fill=tk.X)
+        tk.Label(left_frame, text=f"Order ID: #{order.id}", anchor="w", font=("Arial", 10)).pack(fill=tk.X)
+        tk.Label(left_frame, text=f"Customer: {order.customer}", anchor="w", font=("Arial", 10)).pack(fill=tk.X)
+        tk.Label(left_frame, text=f"Order Date: {order.order_date}", anchor="w", font=("Arial", 10)).pack(fill=tk.X)
 
         # Right column
         right_frame = tk.Frame(info_frame)
         right_frame.pack(side=tk.RIGHT, anchor="e")
 
-        tk.Label(right_frame, text=f"Status: {order[7]}", anchor="e", font=("Arial", 10)).pack(fill=tk.X)
-        tk.Label(right_frame, text=f"Payment: {order[9]}", anchor="e", font=("Arial", 10)).pack(fill=tk.X)
-        tk.Label(right_frame, text=f"Payment Status: {order[8]}", anchor="e", font=("Arial", 10)).pack(fill=tk.X)
+        tk.Label(right_frame, text=f"Status: {order.status}", anchor="e", font=("Arial", 10)).pack(fill=tk.X)
+        tk.Label(right_frame, text=f"Payment: {order.payment_method}", anchor="e", font=("Arial", 10)).pack(fill=tk.X)
+        tk.Label(right_frame, text=f"Payment Status: {order.payment_status}", anchor="e", font=("Arial", 10)).pack(fill=tk.X)
 
         # Separator
         tk.Frame(main_frame, height=2, bg="black").pack(fill=tk.X, pady=10)
@@ -1049,9 +1762,9 @@ class LaundryManagementSystem:
         tk.Label(details_frame, text="Price", font=("Arial", 10, "bold")).grid(row=0, column=2, sticky="e")
 
         # Service row
-        tk.Label(details_frame, text=order[2], font=("Arial", 10)).grid(row=1, column=0, sticky="w")
-        tk.Label(details_frame, text=f"{order[3]} kg", font=("Arial", 10)).grid(row=1, column=1)
-        tk.Label(details_frame, text=f"RM{order[4]:.2f}", font=("Arial", 10)).grid(row=1, column=2, sticky="e")
+        tk.Label(details_frame, text=order.service, font=("Arial", 10)).grid(row=1, column=0, sticky="w")
+        tk.Label(details_frame, text=f"{order.weight} kg", font=("Arial", 10)).grid(row=1, column=1)
+        tk.Label(details_frame, text=f"RM{order.total_price:.2f}", font=("Arial", 10)).grid(row=1, column=2, sticky="e")
 
         # Separator
         tk.Frame(main_frame, height=2, bg="black").pack(fill=tk.X, pady=10)
@@ -1061,32 +1774,30 @@ class LaundryManagementSystem:
         total_frame.pack(fill=tk.X)
 
         tk.Label(total_frame, text="Total:", font=("Arial", 12, "bold")).pack(side=tk.LEFT)
-        tk.Label(total_frame, text=f"RM{order[4]:.2f}", font=("Arial", 12, "bold")).pack(side=tk.RIGHT)
+        tk.Label(total_frame, text=f"RM{order.total_price:.2f}", font=("Arial", 12, "bold")).pack(side=tk.RIGHT)
 
         # Pickup info
         pickup_frame = tk.Frame(main_frame)
         pickup_frame.pack(fill=tk.X, pady=10)
 
         tk.Label(pickup_frame, text="Pickup Information:", font=("Arial", 10, "bold")).pack(anchor="w")
-        tk.Label(pickup_frame, text=f"Pickup Date: {order[6]}", font=("Arial", 10)).pack(anchor="w")
+        tk.Label(pickup_frame, text=f"Pickup Date: {order.pickup_date}", font=("Arial", 10)).pack(anchor="w")
 
-        # QR code display
-        if order[10]:  # If QR code exists
-            try:
-                img = Image.open(BytesIO(order[10]))
-                img = img.resize((150, 150), Image.Resampling.LANCZOS)
-                qr_img = ImageTk.PhotoImage(img)
+        # QR code display, from the stored PNG or rendered on demand
+        qr_frame = tk.Frame(main_frame)
+        qr_frame.pack(pady=10)
 
-                qr_frame = tk.Frame(main_frame)
-                qr_frame.pack(pady=10)
+        qr_label = tk.Label(qr_frame)
+        qr_label.pack()
 
-                qr_label = tk.Label(qr_frame, image=qr_img)
-                qr_label.image = qr_img
-                qr_label.pack()
+        tk.Label(qr_frame, text="Scan for order details", font=("Arial", 8)).pack()
 
-                tk.Label(qr_frame, text="Scan for order details", font=("Arial", 8)).pack()
-            except Exception as e:
-                print(f"Error displaying QR code: {str(e)}")
+        if qr_bytes:
+            self.show_receipt_qr(qr_label, qr_bytes)
+        else:
+            qr_label.config(text="Generating QR code...")
+            self.tasks.submit(self.qr_cache.get_or_render, order.id, receipt_info,
+                              callback=lambda qr_bytes: self.show_receipt_qr(qr_label, qr_bytes))
 
         # Footer
         footer_frame = tk.Frame(main_frame)
@@ -1107,6 +1818,21 @@ class LaundryManagementSystem:
                                bg="red", fg="white")
         close_button.pack(pady=5)
 
+    def show_receipt_qr(self, qr_label, qr_bytes):
+        if not qr_label.winfo_exists():
+            return
+
+        try:
+            from PIL import Image, ImageTk
+            img = Image.open(BytesIO(qr_bytes))
+            img = img.resize((150, 150), Image.Resampling.LANCZOS)
+            qr_img = ImageTk.PhotoImage(img)
+
+            qr_label.config(image=qr_img, text="")
+            qr_label.image = qr_img
+        except Exception as e:
+            print(f"Error displaying QR code: {str(e)}")
+
 # Main application
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,397 @@
+import argparse
+import asyncio
+import base64
+import binascii
+import json
+import math
+import multiprocessing
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import urlsplit
+
+from change_feed import ChangeFeed
+from database import DB_PATH, open_database
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from metrics import METRICS
+from order_service import DATE_FORMAT, OrderService, OrderServiceError, hash_password
+from qr_codes import QR_STORE_DIR, QRCache, QRStore, render_qr_png
+
+# Where the API listens; kiosks and the mobile app talk JSON to it
+API_HOST = "127.0.0.1"
+API_PORT = 8080
+
+# Threads running OrderService calls; each gets its own reader connection from
+# the Database pool, and writes still queue on the single writer
+API_WORKERS = 16
+
+# Processes rendering receipt QR codes; None means one per CPU
+API_QR_WORKERS = None
+
+# Render and attach each new order's receipt PNG after replying, like the
+# window does with Laundry_service.STORE_QR_PNG
+API_STORE_QR_PNG = True
+
+# A verified login is trusted for this long (seconds) before the password is
+# checked against the database again
+API_AUTH_CACHE_SECONDS = 30
+
+# Idle time (seconds) before a keep-alive connection is closed
+API_KEEPALIVE_TIMEOUT = 15
+
+# Largest request body accepted, in bytes
+API_MAX_BODY = 64 * 1024
+
+# Serve metrics.METRICS at GET /metrics. Orders are counted by whichever
+# process commits them (see database.EXPORT_METRICS): this one when it opens
+# the database itself, the shared server when there is one.
+EXPORT_METRICS = True
+
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def json_value(value):
+    if isinstance(value, bytes):
+        return None
+    if hasattr(value, "strftime"):
+        return value.strftime(DATE_FORMAT)
+    return value
+
+
+def as_json(row, exclude=()):
+    # NamedTuple from order_service as a JSON object
+    return {name: json_value(value) for name, value in row._asdict().items() if name not in exclude}
+
+
+def read_order_request(body):
+    # (service_id, weight) from a quote or order request body
+    try:
+        data = json.loads(body or b"{}")
+        service_id = int(data["service_id"])
+        weight = float(data["weight"])
+    except (ValueError, TypeError, KeyError):
+        raise ApiError(400, "Body must be JSON with a numeric service_id and weight")
+    if not math.isfinite(weight) or weight <= 0:
+        raise ApiError(400, "Please enter a valid weight (positive number)")
+    return service_id, weight
+
+
+class LaundryApi:
+    # HTTP/1.1 JSON front end to OrderService on asyncio streams. Blocking
+    # database calls run on a thread pool and QR renders on a process pool, so
+    # the event loop only parses requests and writes replies. Customers sign
+    # in with HTTP Basic auth using their Laundry_service login.
+    #
+    #   GET  /services                   service catalog
+    #   POST /quote                      {"service_id", "weight"} -> price
+    #   POST /orders                     {"service_id", "weight"} -> new order
+    #   GET  /orders                     the customer's orders, newest first
+    #   GET  /orders/<id>                one order, for polling its status
+    #   POST /orders/<id>/cash-payment   pay in cash at pickup
+    #   GET  /orders/<id>/receipt        receipt details
+    #   GET  /orders/<id>/receipt.png    receipt QR code
+    #   GET  /metrics                    Prometheus metrics
+
+    def __init__(self, db, qr_store=None, workers=API_WORKERS, qr_workers=API_QR_WORKERS,
+                 store_qr_png=API_STORE_QR_PNG):
+        self.db = db
+        self.order_service = OrderService(db, qr_store)
+        # Service edits made in other processes (the admin window) reach the
+        # cached catalog through change_log; polled before every price, under
+        # catalog_lock since a ChangeFeed is not safe to poll concurrently
+        self.change_feed = ChangeFeed(db)
+        self.change_feed.subscribe("services", lambda service_ids: self.order_service.catalog.invalidate())
+        if getattr(db, "metrics", None) is not None:
+            # Orders written by other processes on the same file move the
+            # status gauge too
+            self.change_feed.subscribe("laundry_orders", lambda order_ids: db.seed_order_metrics())
+        self.catalog_lock = asyncio.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-db")
+        # Spawned, not forked: a fork taken mid-run would inherit the listening
+        # socket and open client connections, and keep them open
+        self.qr_executor = ProcessPoolExecutor(max_workers=qr_workers, mp_context=multiprocessing.get_context("spawn"))
+        self.qr_cache = QRCache()
+        self.store_qr_png = store_qr_png
+
+        # Verified logins by (username, password hash) -> (user, expiry)
+        self.logins = {}
+        # In-flight renders by QRCache key, so a burst of requests for one
+        # receipt renders it once
+        self.renders = {}
+        # Background work started by a request but not awaited by it
+        self.background_tasks = set()
+
+        self.routes = [
+            ("GET", re.compile(r"/services"), self.get_services, False),
+            ("POST", re.compile(r"/quote"), self.post_quote, False),
+            ("POST", re.compile(r"/orders"), self.post_order, True),
+            ("GET", re.compile(r"/orders"), self.get_orders, True),
+            ("GET", re.compile(r"/orders/(\d+)"), self.get_order, True),
+            ("POST", re.compile(r"/orders/(\d+)/cash-payment"), self.post_cash_payment, True),
+            ("GET", re.compile(r"/orders/(\d+)/receipt"), self.get_receipt, True),
+            ("GET", re.compile(r"/orders/(\d+)/receipt\.png"), self.get_receipt_png, True),
+        ]
+        if EXPORT_METRICS:
+            self.routes.append(("GET", re.compile(r"/metrics"), self.get_metrics, False))
+
+    async def call(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def start(self, host=API_HOST, port=API_PORT):
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.qr_executor.shutdown(wait=False, cancel_futures=True)
+
+    # HTTP
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), API_KEEPALIVE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line.strip():
+                    break
+
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                    headers = {}
+                    while True:
+                        line = await reader.readline()
+                        if line in (b"\r\n", b"\n", b""):
+                            break
+                        name, _, value = line.decode("latin-1").partition(":")
+                        headers[name.strip().lower()] = value.strip()
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    writer.write(self.response(400, {"error": "Malformed request"}, keep_alive=False))
+                    break
+
+                if length > API_MAX_BODY:
+                    writer.write(self.response(413, {"error": "Request body too large"}, keep_alive=False))
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+
+                status, payload, extra_headers = await self.dispatch(method, target, headers, body)
+                writer.write(self.response(status, payload, keep_alive, extra_headers))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+
+    def response(self, status, payload, keep_alive=True, extra_headers=()):
+        # payload is a JSON-able object, or (content type, bytes)
+        if isinstance(payload, tuple):
+            content_type, body = payload
+        else:
+            content_type, body = "application/json", json.dumps(payload).encode()
+
+        head = [
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        head.extend(f"{name}: {value}" for name, value in extra_headers)
+        return ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body
+
+    async def dispatch(self, method, target, headers, body):
+        # (status, payload, extra headers) for one request
+        path = urlsplit(target).path.rstrip("/") or "/"
+        allowed = []
+        for route_method, pattern, handler, needs_user in self.routes:
+            match = pattern.fullmatch(path)
+            if match is None:
+                continue
+            if route_method != method:
+                allowed.append(route_method)
+                continue
+
+            try:
+                args = [int(group) for group in match.groups()]
+                if needs_user:
+                    args.insert(0, await self.authenticate(headers))
+                status, payload = await handler(body, *args)
+            except ApiError as e:
+                extra_headers = [("WWW-Authenticate", 'Basic realm="laundry"')] if e.status == 401 else []
+                return e.status, {"error": str(e)}, extra_headers
+            except OrderServiceError as e:
+                return 400, {"error": str(e)}, []
+            except Exception as e:
+                print(f"Error in API request {method} {path}: {str(e)}")
+                return 500, {"error": "Internal error"}, []
+            return status, payload, []
+
+        if allowed:
+            return 405, {"error": "Method not allowed"}, [("Allow", ", ".join(allowed))]
+        return 404, {"error": "Not found"}, []
+
+    async def authenticate(self, headers):
+        # The user as {"id", "username", "is_admin"} from HTTP Basic credentials
+        scheme, _, credentials = headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "basic":
+            raise ApiError(401, "Please sign in")
+        try:
+            username, _, password = base64.b64decode(credentials, validate=True).decode().partition(":")
+        except (binascii.Error, UnicodeDecodeError):
+            raise ApiError(401, "Invalid username or password")
+
+        key = (username, hash_password(password))
+        cached = self.logins.get(key)
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+
+        found = await self.call(self.order_service.login, username, password)
+        if found is None:
+            self.logins.pop(key, None)
+            raise ApiError(401, "Invalid username or password")
+
+        user = found._asdict()
+        self.logins[key] = (user, time.monotonic() + API_AUTH_CACHE_SECONDS)
+        return user
+
+    # Handlers, each returning (status, payload)
+
+    async def get_services(self, body):
+        await self.sync_catalog()
+        services = await self.call(self.order_service.list_services)
+        return 200, [as_json(service) for service in services]
+
+    async def post_quote(self, body):
+        await self.sync_catalog()
+        quote = await self.call(self.order_service.quote, *read_order_request(body))
+        return 200, as_json(quote)
+
+    async def post_order(self, body, user):
+        service_id, weight = read_order_request(body)
+        await self.sync_catalog()
+        order = await self.call(self.order_service.create_order, user["id"], user["username"], service_id, weight)
+        if self.store_qr_png:
+            self.in_background(self.attach_qr(order))
+        return 201, as_json(order)
+
+    async def get_orders(self, body, user):
+        orders = await self.call(self.order_service.list_customer_orders, user["id"])
+        return 200, [as_json(order) for order in orders]
+
+    async def get_order(self, body, user, order_id):
+        return 200, as_json(await self.own_order(user, order_id))
+
+    async def post_cash_payment(self, body, user, order_id):
+        order = await self.own_order(user, order_id)
+        if order.payment_status == "Paid":
+            raise ApiError(409, "This order has already been paid")
+        await self.call(self.order_service.choose_cash_payment, order_id)
+        return 200, as_json(await self.own_order(user, order_id))
+
+    async def get_receipt(self, body, user, order_id):
+        receipt, qr_bytes, receipt_info = await self.own_receipt(user, order_id)
+        return 200, as_json(receipt, exclude=("qr_code", "qr_payload", "qr_ref"))
+
+    async def get_receipt_png(self, body, user, order_id):
+        receipt, qr_bytes, receipt_info = await self.own_receipt(user, order_id)
+        if qr_bytes is None:
+            qr_bytes = await self.render_receipt_qr(receipt.id, receipt_info)
+        return 200, ("image/png", qr_bytes)
+
+    async def get_metrics(self, body):
+        return 200, (METRICS_CONTENT_TYPE, METRICS.render().encode())
+
+    # Helpers
+
+    async def sync_catalog(self):
+        # Drops the cached catalog when change_log shows a services write, so
+        # a new price applies and a deleted service is refused at once; one
+        # cheap query when nothing changed
+        async with self.catalog_lock:
+            await self.call(self.change_feed.poll)
+
+    async def own_order(self, user, order_id):
+        orders = await self.call(self.order_service.customer_orders_by_id, user["id"], [order_id])
+        if not orders:
+            raise ApiError(404, "Order not found")
+        return orders[0]
+
+    async def own_receipt(self, user, order_id):
+        # OrderService.receipt_with_qr on the thread pool, so the store and
+        # cache files are read there too
+        receipt, qr_bytes, receipt_info = await self.call(self.order_service.receipt_with_qr, order_id, self.qr_cache)
+        if receipt is None or (receipt.customer != user["username"] and not user["is_admin"]):
+            raise ApiError(404, "Order not found")
+        return receipt, qr_bytes, receipt_info
+
+    async def render_qr(self, payload):
+        # Timed here rather than in the worker process, whose metrics are never
+        # exported; includes any wait for a free worker
+        with METRICS.qr_render_seconds.time():
+            return await asyncio.get_running_loop().run_in_executor(self.qr_executor, render_qr_png, payload)
+
+    async def render_receipt_qr(self, order_id, payload):
+        key = self.qr_cache.key(order_id, payload)
+        render = self.renders.get(key)
+        if render is None:
+            render = self.renders[key] = asyncio.ensure_future(self.render_qr(payload))
+            render.add_done_callback(lambda _: self.renders.pop(key, None))
+        qr_bytes = await asyncio.shield(render)
+        self.qr_cache.put(order_id, payload, qr_bytes)
+        return qr_bytes
+
+    async def attach_qr(self, order):
+        qr_bytes = await self.render_qr(order.receipt_info)
+        await self.call(self.order_service.attach_qr, order.id, qr_bytes)
+
+    def in_background(self, coroutine):
+        task = asyncio.ensure_future(coroutine)
+        self.background_tasks.add(task)
+
+        def finished(task):
+            self.background_tasks.discard(task)
+            if not task.cancelled() and task.exception() is not None:
+                print(f"Error in API background task: {str(task.exception())}")
+
+        task.add_done_callback(finished)
+
+
+async def serve(api, host=API_HOST, port=API_PORT):
+    server = await api.start(host, port)
+    address = server.sockets[0].getsockname()
+    print(f"Laundry API on http://{address[0]}:{address[1]}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP/JSON API for laundry kiosks and the mobile app")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--archive", help="archive database (default: <db name>_archive.db next to --db)")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=API_WORKERS, help="threads running database calls")
+    args = parser.parse_args()
+
+    api = LaundryApi(open_database(args.db, args.archive), QRStore(QR_STORE_DIR) if QR_STORE_DIR else None, args.workers)
+    try:
+        asyncio.run(serve(api, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import argparse
+
+from database import DB_PATH, Database, archive_path_for, initialize_schema
+
+# Completed/Cancelled orders older than this many days are moved to the archive
+ARCHIVE_AFTER_DAYS = 180
+
+# Statuses an order never leaves, and so can safely be archived
+ARCHIVE_STATUSES = ("Completed", "Cancelled")
+
+# Orders moved per transaction, so the counters are never locked out for long
+ARCHIVE_BATCH_SIZE = 1000
+
+
+def archive_orders(db, older_than_days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE, progress=print):
+    # Moves finished orders placed more than older_than_days ago from
+    # laundry_orders into archive.laundry_orders. db must be a Database opened
+    # with an archive_path. Returns the number of orders moved.
+    if not db.archive_path:
+        raise ValueError("Database was opened without an archive")
+
+    statuses = ", ".join("?" * len(ARCHIVE_STATUSES))
+    cutoff = f"-{older_than_days} days"
+    moved = 0
+    while True:
+        # In WAL mode a transaction over two attached databases is only atomic
+        # per database, so each batch is copied and committed first, and only
+        # then deleted from main: a crash in between leaves a row in both
+        # places, never in neither
+        with db.transaction() as cursor:
+            cursor.execute(f'''
+                SELECT id FROM main.laundry_orders
+                WHERE status IN ({statuses}) AND order_date < datetime('now', ?)
+                ORDER BY id
+                LIMIT ?
+            ''', ARCHIVE_STATUSES + (cutoff, batch_size))
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                break
+
+            # Same column list on both sides; initialize_schema keeps the
+            # archive table's columns in step with the live one
+            cursor.execute("PRAGMA main.table_info(laundry_orders)")
+            columns = ", ".join(row[1] for row in cursor.fetchall())
+            id_list = ", ".join("?" * len(ids))
+
+            # OR REPLACE makes a rerun after an interrupted batch harmless
+            cursor.execute(f'''
+                INSERT OR REPLACE INTO archive.laundry_orders ({columns})
+                SELECT {columns} FROM main.laundry_orders WHERE id IN ({id_list})
+            ''', ids)
+
+        with db.transaction() as cursor:
+            # Only rows whose archived copy is identical; one edited since the
+            # copy stays live and is picked up again by the next batch
+            cursor.execute(f'''
+                DELETE FROM main.laundry_orders
+                WHERE id IN (
+                    SELECT id FROM (
+                        SELECT {columns} FROM main.laundry_orders WHERE id IN ({id_list})
+                        INTERSECT
+                        SELECT {columns} FROM archive.laundry_orders WHERE id IN ({id_list})
+                    )
+                )
+            ''', ids + ids)
+            deleted = cursor.rowcount
+
+        with db.transaction() as cursor:
+            # Archived copies of rows that stayed live are out of date
+            cursor.execute(f'''
+                DELETE FROM archive.laundry_orders
+                WHERE id IN ({id_list}) AND id IN (SELECT id FROM main.laundry_orders WHERE id IN ({id_list}))
+            ''', ids + ids)
+
+        if not deleted:
+            # Every row of the batch changed under us; stop rather than spin
+            progress(f"Orders #{ids[0]}-#{ids[-1]} keep changing; run the archive again later")
+            break
+        moved += deleted
+        progress(f"Archived {moved} orders (up to order #{ids[-1]})")
+
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move old finished laundry orders into the archive database")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--archive", help="archive database (default: <db name>_archive.db next to --db)")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS,
+                        help="archive Completed/Cancelled orders placed more than this many days ago")
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    args.archive = args.archive or archive_path_for(args.db)
+    db = Database(args.db, archive_path=args.archive)
+    try:
+        initialize_schema(db)
+        moved = archive_orders(db, args.days, args.batch_size)
+    finally:
+        db.close()
+    print(f"Moved {moved} orders from {args.db} to {args.archive}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from database import Database, initialize_schema
+from order_service import DATE_FORMAT, ORDER_STATUSES, PAYMENT_METHODS, OrderService
+from qr_codes import QRStore, render_qr_png
+
+# Order counts measured by default; the database grows from one size to the next
+BENCHMARK_SIZES = (10000, 100000)
+
+# Synthetic customers the seeded orders are spread across
+BENCHMARK_USERS = 500
+
+# Rows per transaction while seeding
+SEED_BATCH_SIZE = 10000
+
+# Timed repetitions of each read path per size
+BENCHMARK_SAMPLES = 200
+
+# Orders created through the submit path per size
+BENCHMARK_SUBMITS = 200
+
+# Must match Laundry_service.ORDERS_PAGE_SIZE so the grid pages are measured
+ORDERS_PAGE_SIZE = 100
+
+# Seeded orders are spread over this many days before now
+SEED_HISTORY_DAYS = 365
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    # Latencies in milliseconds
+    return {
+        "samples": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3),
+    }
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def database_size(path):
+    # Main file plus whatever is still sitting in the WAL
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+
+
+def seed_users(db, count):
+    # Customers are named bench0, bench1, ... so a rerun on the same file reuses them
+    db.executemany('''
+        INSERT OR IGNORE INTO users (username, password, email, phone)
+        VALUES (?, 'x', ?, NULL)
+    ''', ((f"bench{i}", f"bench{i}@example.com") for i in range(count)))
+    return [row[0] for row in db.fetchall("SELECT id FROM users WHERE username LIKE 'bench%'")]
+
+
+def seed_orders(db, user_ids, services, count, rng):
+    # Bulk-loads count orders with random dates, statuses and payments. The
+    # change_log rows the triggers write for them are dropped afterwards so the
+    # log looks like a long-running install rather than one huge import.
+    now = datetime.now()
+    log_mark = db.fetchone("SELECT COALESCE(MAX(seq), 0) FROM change_log")[0]
+
+    for start in range(0, count, SEED_BATCH_SIZE):
+        rows = []
+        for _ in range(min(SEED_BATCH_SIZE, count - start)):
+            service = rng.choice(services)
+            weight = round(rng.uniform(0.5, 20), 1)
+            order_date = now - timedelta(seconds=rng.randrange(SEED_HISTORY_DAYS * 86400))
+            pickup_date = order_date + timedelta(hours=service.estimated_time_hours)
+            payment_method = rng.choice(PAYMENT_METHODS + (None,))
+            payment_status = "Paid" if payment_method == "Online Transfer" else "Pending"
+            rows.append((rng.choice(user_ids), service.id, order_date.strftime(DATE_FORMAT),
+                         pickup_date.strftime(DATE_FORMAT), int(pickup_date.timestamp()),
+                         rng.choice(ORDER_STATUSES), weight, weight * service.price_per_kg, payment_method,
+                         payment_status))
+
+        db.executemany('''
+            INSERT INTO laundry_orders
+            (user_id, service_id, order_date, pickup_date, pickup_ts, status, weight, total_price,
+             payment_method, payment_status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+
+    db.execute("DELETE FROM change_log WHERE seq > ?", (log_mark,))
+
+
+def bench_submit(service, user_ids, services, count, rng):
+    # Same work as LaundryManagementSystem.submit_order minus the widgets:
+    # price, insert, render the receipt QR and store it
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(count):
+        op_start = time.perf_counter()
+        order = service.create_order(rng.choice(user_ids), "bench", rng.choice(services).id,
+                                     round(rng.uniform(0.5, 20), 1))
+        service.attach_qr(order.id, render_qr_png(order.receipt_info))
+        latencies.append(time.perf_counter() - op_start)
+    elapsed = time.perf_counter() - start
+
+    result = summarize(latencies)
+    result["orders_per_second"] = round(count / elapsed, 1)
+    return result
+
+
+def bench_reads(db, service, user_ids, samples, rng):
+    # Read paths behind the dashboards: refresh_orders (first grid page),
+    # load_more_orders (a page deeper in the history), refresh_my_orders and
+    # show_receipt (including the QR render for orders stored without one)
+    order_ids = [row[0] for row in db.fetchall("SELECT id FROM laundry_orders")]
+    keys = db.fetchall("SELECT order_date, id FROM laundry_orders ORDER BY RANDOM() LIMIT ?", (samples,))
+
+    def show_receipt(order_id):
+        receipt = service.get_receipt(order_id)
+        if service.receipt_qr(receipt) is None:
+            render_qr_png(service.receipt_info(receipt))
+
+    return {
+        "refresh_orders": summarize([timed(service.list_orders, ORDERS_PAGE_SIZE) for _ in range(samples)]),
+        "load_more_orders": summarize([timed(service.list_orders, ORDERS_PAGE_SIZE, tuple(key)) for key in keys]),
+        "refresh_my_orders": summarize([timed(service.list_customer_orders, rng.choice(user_ids))
+                                        for _ in range(samples)]),
+        "show_receipt": summarize([timed(show_receipt, rng.choice(order_ids)) for _ in range(samples)]),
+    }
+
+
+def run(path, sizes, samples, submits, qr_store=None, seed=0, progress=print):
+    rng = random.Random(seed)
+    db = Database(path)
+    try:
+        initialize_schema(db)
+        service = OrderService(db, qr_store)
+        services = service.list_services()
+        user_ids = seed_users(db, BENCHMARK_USERS)
+
+        results = []
+        for size in sorted(sizes):
+            current = db.fetchone("SELECT COUNT(*) FROM laundry_orders")[0]
+            if size > current:
+                progress(f"Seeding {size - current:,} orders...")
+                start = time.perf_counter()
+                seed_orders(db, user_ids, services, size - current, rng)
+                seed_seconds = time.perf_counter() - start
+            else:
+                seed_seconds = 0.0
+
+            progress(f"Measuring at {size:,} orders...")
+            result = {"orders": size, "seed_seconds": round(seed_seconds, 2)}
+            result["submit_order"] = bench_submit(service, user_ids, services, submits, rng)
+            result.update(bench_reads(db, service, user_ids, samples, rng))
+
+            with db.write_lock:
+                db.writer.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            result["database_bytes"] = database_size(path)
+            results.append(result)
+
+        return results
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Laundry order throughput and dashboard latency benchmark")
+    parser.add_argument("--sizes", type=lambda s: [int(n) for n in s.split(",")], default=list(BENCHMARK_SIZES),
+                        help="comma separated order counts, e.g. 10000,100000,1000000")
+    parser.add_argument("--samples", type=int, default=BENCHMARK_SAMPLES)
+    parser.add_argument("--submits", type=int, default=BENCHMARK_SUBMITS)
+    parser.add_argument("--db", help="database file to grow (default: a temporary file)")
+    parser.add_argument("--qr-store", help="store receipt PNGs in this directory instead of qr_code BLOBs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    work_dir = None
+    path = args.db
+    if not path:
+        work_dir = tempfile.mkdtemp(prefix="laundry-bench-")
+        path = os.path.join(work_dir, "laundry.db")
+
+    try:
+        results = run(path, args.sizes, args.samples, args.submits,
+                      QRStore(args.qr_store) if args.qr_store else None, args.seed,
+                      progress=lambda message: print(message, file=sys.stderr))
+    finally:
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "samples": args.samples,
+        "submits": args.submits,
+        "qr_store": bool(args.qr_store),
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
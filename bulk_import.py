@@ -0,0 +1,200 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from database import DB_PATH, Database, fetch_by_ids, initialize_schema
+from order_service import OrderService, OrderServiceError
+from qr_codes import QRStore, render_qr_png
+
+# Orders inserted per transaction
+IMPORT_BATCH_SIZE = 5000
+
+# Processes rendering receipt QR codes after the insert; None means one per CPU
+IMPORT_QR_WORKERS = None
+
+# Receipt PNGs handed to a worker process at a time
+IMPORT_QR_CHUNK_SIZE = 64
+
+
+class ImportRowError(Exception):
+    pass
+
+
+def read_rows(path):
+    # Yields (line number, record) from a CSV file with a header row or from a
+    # JSONL file with one object per line, without loading the whole file
+    with open(path, newline="") as f:
+        if path.lower().endswith((".jsonl", ".ndjson")):
+            for line_no, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        yield line_no, json.loads(line)
+                    except ValueError:
+                        yield line_no, None
+        else:
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+
+
+def batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def lookup_customers(db, records):
+    # Maps every user_id and username referenced by records to (id, username)
+    records = [r for r in records if isinstance(r, dict)]
+    user_ids = {int(r["user_id"]) for r in records if str(r.get("user_id") or "").strip().isdigit()}
+    usernames = {str(r["customer"]).strip() for r in records if r.get("customer")}
+
+    customers = {}
+    for user_id, username in fetch_by_ids(db, "SELECT id, username FROM users WHERE id IN ({ids})", user_ids):
+        customers[user_id] = (user_id, username)
+    for user_id, username in fetch_by_ids(db, "SELECT id, username FROM users WHERE username IN ({ids})",
+                                          usernames):
+        customers[username] = (user_id, username)
+    return customers
+
+
+def parse_row(record, customers, services):
+    # Record -> (user_id, customer, service_id, weight); customers are given by
+    # user_id or by username in a "customer" column
+    if not isinstance(record, dict):
+        raise ImportRowError("not a JSON object")
+
+    if str(record.get("user_id") or "").strip():
+        if not str(record["user_id"]).strip().isdigit():
+            raise ImportRowError(f"invalid user_id {record['user_id']!r}")
+        key = int(str(record["user_id"]).strip())
+    elif record.get("customer"):
+        key = str(record["customer"]).strip()
+    else:
+        raise ImportRowError("missing user_id or customer")
+    if key not in customers:
+        raise ImportRowError(f"unknown customer {key!r}")
+    user_id, username = customers[key]
+
+    try:
+        service_id = int(str(record.get("service_id", "")).strip())
+    except ValueError:
+        raise ImportRowError(f"invalid service_id {record.get('service_id')!r}")
+    if service_id not in services:
+        raise ImportRowError(f"unknown service_id {service_id}")
+
+    try:
+        weight = float(str(record.get("weight", "")).strip())
+    except ValueError:
+        raise ImportRowError(f"invalid weight {record.get('weight')!r}")
+    if not 0 < weight < float("inf"):
+        raise ImportRowError(f"weight must be positive, got {weight}")
+
+    return user_id, username, service_id, weight
+
+
+def render_receipt_qrs(service, orders, workers=IMPORT_QR_WORKERS, progress=print):
+    # Renders the receipt PNGs of freshly imported orders in parallel and
+    # stores them batch by batch. Returns the number rendered.
+    rendered = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for batch in batched(orders, IMPORT_BATCH_SIZE):
+            pngs = executor.map(render_qr_png, [order.receipt_info for order in batch],
+                                chunksize=IMPORT_QR_CHUNK_SIZE)
+            service.attach_qrs(zip([order.id for order in batch], pngs))
+            rendered += len(batch)
+            progress(f"Rendered {rendered:,} receipt QR codes")
+    return rendered
+
+
+def import_orders(db, path, qr_store=None, batch_size=IMPORT_BATCH_SIZE, render_qr=True,
+                  workers=IMPORT_QR_WORKERS, progress=print):
+    # Streams path into laundry_orders, one transaction per batch_size valid
+    # rows. Invalid rows are reported through progress and skipped; a batch
+    # the database refuses is rolled back as a whole and the import stops.
+    # Returns a summary dict.
+    service = OrderService(db, qr_store)
+    services = {s.id for s in service.list_services()}
+
+    start = time.perf_counter()
+    imported = []
+    rejected = 0
+    total = 0
+    for batch in batched(read_rows(path), batch_size):
+        total += len(batch)
+        customers = lookup_customers(db, [record for _, record in batch])
+
+        orders = []
+        for line_no, record in batch:
+            try:
+                orders.append(parse_row(record, customers, services))
+            except ImportRowError as e:
+                rejected += 1
+                progress(f"{path}:{line_no}: skipped, {e}")
+
+        if orders:
+            imported.extend(service.create_orders(orders))
+        progress(f"Imported {len(imported):,} of {total:,} rows")
+
+    insert_seconds = time.perf_counter() - start
+
+    qr_seconds = 0.0
+    if render_qr and imported:
+        qr_start = time.perf_counter()
+        render_receipt_qrs(service, imported, workers, progress)
+        qr_seconds = time.perf_counter() - qr_start
+
+    return {
+        "rows": total,
+        "imported": len(imported),
+        "rejected": rejected,
+        "insert_seconds": round(insert_seconds, 3),
+        "rows_per_second": round(len(imported) / insert_seconds, 1) if insert_seconds else 0.0,
+        "qr_seconds": round(qr_seconds, 3),
+        "qr_per_second": round(len(imported) / qr_seconds, 1) if qr_seconds else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import laundry orders from a CSV or JSONL file")
+    parser.add_argument("path", help="CSV with a header row, or .jsonl; columns user_id or customer, "
+                                     "service_id, weight")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--qr-store", help="store receipt PNGs in this directory instead of qr_code BLOBs")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=IMPORT_QR_WORKERS)
+    parser.add_argument("--no-qr", action="store_true",
+                        help="skip rendering receipt PNGs; receipts render them on demand")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        parser.error(f"{args.path} does not exist")
+
+    db = Database(args.db)
+    try:
+        initialize_schema(db)
+        summary = import_orders(db, args.path, QRStore(args.qr_store) if args.qr_store else None,
+                                args.batch_size, not args.no_qr, args.workers,
+                                progress=lambda message: print(message, file=sys.stderr))
+    except OrderServiceError as e:
+        sys.exit(f"Import stopped: {e}")
+    finally:
+        db.close()
+
+    print(f"Imported {summary['imported']:,} of {summary['rows']:,} rows "
+          f"({summary['rejected']:,} rejected) at {summary['rows_per_second']:,.0f} rows/s")
+    if summary["qr_seconds"]:
+        print(f"Rendered {summary['imported']:,} receipt QR codes at {summary['qr_per_second']:,.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import threading
+import time
+from collections import defaultdict
+
+from database import CHANGE_LOG_PRUNE_INTERVAL, CHANGE_LOG_RETENTION, PRUNE_CHANGE_LOG_QUERY
+
+# How often (ms) an open window checks change_log for writes made by other
+# terminals; writes made through this process are announced immediately
+CHANGE_FEED_INTERVAL = 1000
+
+# How often (ms) the Tk loop checks whether a local write was announced; no
+# query is run unless one was
+CHANGE_FEED_WAKE_INTERVAL = 50
+
+CHANGE_FEED_QUERY = '''
+    SELECT table_name, row_id FROM change_log
+    WHERE seq > ? AND seq <= ?
+'''
+
+CHANGED_IDS_QUERY = '''
+    SELECT DISTINCT row_id FROM change_log
+    WHERE seq > ? AND seq <= ? AND table_name = ?
+'''
+
+
+class ChangeFeed:
+    # Publish/subscribe over change_log. Subscribers register per table and
+    # are called with the set of changed row ids, or with None when the log
+    # was pruned past the feed's watermark and they should reload everything.
+    # Local writers call notify(), from any thread, so their own changes go out
+    # within CHANGE_FEED_WAKE_INTERVAL; other terminals' changes arrive on the
+    # next poll. With a Tk root, polls are scheduled and callbacks run on the
+    # Tk loop while the change_log queries run on tasks, a
+    # task_runner.TaskRunner; without one, the caller drives poll().
+
+    def __init__(self, db, root=None, interval=CHANGE_FEED_INTERVAL, tasks=None):
+        self.db = db
+        self.root = root
+        self.tasks = tasks
+        self.interval = interval
+        self.subscribers = defaultdict(list)
+        self.lock = threading.Lock()
+        # Set by the first poll, so creating a feed runs no query
+        self.watermark = None
+        self.poll_after = None
+        self.polling = False
+        self.notified = False
+        self.next_poll = time.monotonic() + interval / 1000
+        # Startup already pruned, see database.initialize_schema
+        self.next_prune = time.monotonic() + CHANGE_LOG_PRUNE_INTERVAL
+
+    def current_watermark(self):
+        # Highest sequence ever handed out by change_log, survives pruning
+        row = self.db.fetchone("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'")
+        return row[0] if row else 0
+
+    def covers(self, watermark):
+        # Whether change_log still holds every entry after watermark
+        oldest = self.db.fetchone("SELECT MIN(seq) FROM change_log")[0]
+        return oldest is not None and oldest <= watermark + 1
+
+    def changed_ids(self, table_name, watermark):
+        # (new watermark, ids of table_name's rows changed since watermark),
+        # with None for the ids when the log was pruned past it and the caller
+        # has to reload everything. Queries only, like collect().
+        current = self.current_watermark()
+        if current == watermark:
+            return current, set()
+        if not self.covers(watermark):
+            return current, None
+
+        rows = self.db.fetchall(CHANGED_IDS_QUERY, (watermark, current, table_name))
+        return current, {row[0] for row in rows}
+
+    def subscribe(self, table_name, callback):
+        # Returns a function that removes the subscription again
+        with self.lock:
+            self.subscribers[table_name].append(callback)
+
+        def unsubscribe():
+            with self.lock:
+                if callback in self.subscribers[table_name]:
+                    self.subscribers[table_name].remove(callback)
+        return unsubscribe
+
+    def start(self):
+        if self.root is not None and self.poll_after is None:
+            self.poll_after = self.root.after(CHANGE_FEED_WAKE_INTERVAL, self.scheduled_poll)
+
+    def stop(self):
+        if self.poll_after is not None:
+            self.root.after_cancel(self.poll_after)
+            self.poll_after = None
+
+    def scheduled_poll(self):
+        self.poll_after = None
+        try:
+            if not self.polling and (self.notified or time.monotonic() >= self.next_poll):
+                if self.tasks is None:
+                    self.poll()
+                else:
+                    self.poll_in_background()
+        finally:
+            self.start()
+
+    def notify(self):
+        # Called after a local write, possibly on a worker thread where Tk must
+        # not be touched; bursts are coalesced into a single poll
+        if self.root is None:
+            self.poll()
+        else:
+            self.notified = True
+
+    def begin_poll(self):
+        self.notified = False
+        self.next_poll = time.monotonic() + self.interval / 1000
+        return self.watermark
+
+    def poll(self):
+        self.deliver(self.collect(self.begin_poll()))
+
+    def poll_in_background(self):
+        # One poll in flight at a time; the watermark only moves in deliver(),
+        # so a poll that fails is simply repeated
+        self.polling = True
+
+        def collected(result):
+            self.polling = False
+            self.deliver(result)
+
+        def failed(e):
+            self.polling = False
+            print(f"Error polling change_log: {str(e)}")
+
+        self.tasks.submit(self.collect, self.begin_poll(), callback=collected, error=failed)
+
+    def prune(self):
+        # Drops change_log entries past CHANGE_LOG_RETENTION once every
+        # CHANGE_LOG_PRUNE_INTERVAL; a long-running process would otherwise
+        # let the log grow until its next restart
+        if time.monotonic() < self.next_prune:
+            return
+        self.next_prune = time.monotonic() + CHANGE_LOG_PRUNE_INTERVAL
+        try:
+            self.db.execute(PRUNE_CHANGE_LOG_QUERY, (CHANGE_LOG_RETENTION,))
+        except Exception as e:
+            print(f"Error pruning change_log: {str(e)}")
+
+    def collect(self, watermark):
+        # (new watermark, changed row ids per table) since watermark, with None
+        # for the changes when the log was pruned past it. Database calls only,
+        # so it can run on a worker thread.
+        self.prune()
+        current = self.current_watermark()
+        if watermark is None or current == watermark:
+            return current, {}
+
+        if not self.covers(watermark):
+            return current, None
+
+        changes = defaultdict(set)
+        for table_name, row_id in self.db.fetchall(CHANGE_FEED_QUERY, (watermark, current)):
+            changes[table_name].add(row_id)
+        return current, changes
+
+    def deliver(self, result):
+        # Hands collect()'s result to the subscribers
+        current, changes = result
+        first_poll = self.watermark is None
+        self.watermark = current
+        if first_poll or changes == {}:
+            return
+
+        with self.lock:
+            subscribers = {table_name: list(callbacks) for table_name, callbacks in self.subscribers.items()}
+
+        for table_name, callbacks in subscribers.items():
+            if changes is not None and table_name not in changes:
+                continue
+            for callback in callbacks:
+                try:
+                    callback(None if changes is None else changes[table_name])
+                except Exception as e:
+                    print(f"Error delivering {table_name} changes: {str(e)}")
@@ -0,0 +1,593 @@
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from metrics import METRICS, MetricsExporter
+from profiling import PROFILER, ProfiledConnection
+
+# SQLite database file
+DB_PATH = 'laundry.db'
+
+# Pragmas applied to every connection. WAL lets other counter terminals keep
+# reading while one writes, and with WAL synchronous=NORMAL only syncs at
+# checkpoints, which takes the fsync off each order's commit.
+CONNECTION_PROFILE = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -65536,        # in KiB when negative, i.e. 64 MiB
+    "mmap_size": 268435456,      # 256 MiB
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,        # ms to wait for another terminal's lock
+}
+
+# Address of a shared database server (see serve()); when set, terminals send
+# their queries there instead of opening DB_PATH themselves
+DB_SERVER_ADDRESS = None         # e.g. ("127.0.0.1", 50007)
+
+# Environment variable holding the shared server's authentication key. The
+# server unpickles whatever an authenticated client sends, so the key must be
+# a secret; there is deliberately no default.
+DB_SERVER_AUTHKEY_ENV = "LAUNDRY_DB_AUTHKEY"
+
+# Cold store for old Completed/Cancelled orders (see archive.py), attached to
+# every connection of the app as "archive". It lives next to the database it
+# belongs to (see archive_path_for); False leaves it out.
+ATTACH_ARCHIVE = True
+
+# Tables whose writes are recorded in change_log for incremental refresh, with
+# the columns whose updates are logged (QR bookkeeping never shows in a tree)
+TRACKED_TABLES = {
+    "laundry_orders": ("user_id", "service_id", "order_date", "pickup_date", "status", "weight",
+                       "total_price", "payment_method", "payment_status"),
+    "services": ("name", "price_per_kg", "description", "estimated_time_hours"),
+    "users": ("username", "email", "phone", "is_admin"),
+}
+
+# Index customers' username/email/phone with FTS5 for the orders search, when
+# this SQLite build has FTS5; otherwise the search falls back to LIKE
+CUSTOMER_SEARCH_FTS = True
+
+# Time every statement of the app's connections into profiling.PROFILER
+PROFILE_QUERIES = True
+
+# Record commit latency and order writes into metrics.METRICS. Whichever
+# process owns the pool counts, so with a shared server every terminal's writes
+# are counted (and exported) once, by the server.
+EXPORT_METRICS = True
+
+# Report each new order and each status or payment change to
+# Database.order_written. TEMP, so they live on the writer connection of the
+# process that counts and never fire for another terminal's writes.
+ORDER_METRICS_TRIGGERS = (
+    '''
+    CREATE TEMP TRIGGER IF NOT EXISTS metrics_order_insert
+    AFTER INSERT ON main.laundry_orders
+    BEGIN
+        SELECT order_written(NULL, COALESCE(NEW.status, 'Pending'), NULL, NEW.payment_status, NEW.payment_method);
+    END
+    ''',
+    '''
+    CREATE TEMP TRIGGER IF NOT EXISTS metrics_order_update
+    AFTER UPDATE OF status, payment_status ON main.laundry_orders
+    WHEN OLD.status IS NOT NEW.status OR OLD.payment_status IS NOT NEW.payment_status
+    BEGIN
+        SELECT order_written(COALESCE(OLD.status, 'Pending'), COALESCE(NEW.status, 'Pending'),
+                             OLD.payment_status, NEW.payment_status, NEW.payment_method);
+    END
+    ''',
+)
+
+# Change log entries older than this are pruned at startup and then every
+# CHANGE_LOG_PRUNE_INTERVAL seconds by any process polling a change feed
+CHANGE_LOG_RETENTION = "-1 day"
+CHANGE_LOG_PRUNE_INTERVAL = 3600
+
+PRUNE_CHANGE_LOG_QUERY = "DELETE FROM change_log WHERE changed_at < datetime('now', ?)"
+
+# Adds (sign = "") or removes (sign = "-") one order ({row} = NEW or OLD) in
+# its order_stats bucket
+ORDER_STATS_UPSERT = '''
+    INSERT INTO order_stats (day, service_id, status, payment_status, orders, weight, revenue)
+    VALUES (COALESCE(date({row}.order_date), date('now')), {row}.service_id,
+            COALESCE({row}.status, 'Pending'), COALESCE({row}.payment_status, 'Pending'),
+            {sign}1, {sign}{row}.weight, {sign}{row}.total_price)
+    ON CONFLICT (day, service_id, status, payment_status) DO UPDATE SET
+        orders = orders + excluded.orders,
+        weight = weight + excluded.weight,
+        revenue = revenue + excluded.revenue;
+'''
+
+# Bump SCHEMA_VERSION and add an entry to SCHEMA_MIGRATIONS when the index set
+# or a derived table changes; the applied version is kept in PRAGMA user_version
+SCHEMA_VERSION = 4
+SCHEMA_MIGRATIONS = {
+    1: (
+        "CREATE INDEX IF NOT EXISTS idx_orders_user_date ON laundry_orders (user_id, order_date DESC, id DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_orders_date_id ON laundry_orders (order_date DESC, id DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_orders_status ON laundry_orders (status)",
+        "CREATE INDEX IF NOT EXISTS idx_orders_payment_status ON laundry_orders (payment_status)",
+    ),
+    # Dashboard aggregates per day x service x status x payment status, kept
+    # current by triggers. Nothing subtracts deleted orders, so the figures
+    # keep covering orders that are later archived.
+    2: (
+        '''
+        CREATE TABLE IF NOT EXISTS order_stats (
+            day TEXT NOT NULL,
+            service_id INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            payment_status TEXT NOT NULL,
+            orders INTEGER NOT NULL,
+            weight REAL NOT NULL,
+            revenue REAL NOT NULL,
+            PRIMARY KEY (day, service_id, status, payment_status)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        INSERT INTO order_stats (day, service_id, status, payment_status, orders, weight, revenue)
+        SELECT COALESCE(date(order_date), date('now')), service_id, COALESCE(status, 'Pending'),
+               COALESCE(payment_status, 'Pending'), COUNT(*), SUM(weight), SUM(total_price)
+        FROM laundry_orders
+        GROUP BY 1, 2, 3, 4
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS laundry_orders_insert_stats
+        AFTER INSERT ON laundry_orders
+        BEGIN
+            {ORDER_STATS_UPSERT.format(row="NEW", sign="")}
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS laundry_orders_update_stats
+        AFTER UPDATE OF order_date, service_id, status, payment_status, weight, total_price ON laundry_orders
+        BEGIN
+            {ORDER_STATS_UPSERT.format(row="OLD", sign="-")}
+            {ORDER_STATS_UPSERT.format(row="NEW", sign="")}
+            DELETE FROM order_stats
+            WHERE day = COALESCE(date(OLD.order_date), date('now')) AND service_id = OLD.service_id
+              AND status = COALESCE(OLD.status, 'Pending')
+              AND payment_status = COALESCE(OLD.payment_status, 'Pending')
+              AND orders = 0;
+        END
+        ''',
+    ),
+    # Status and payment filters of the orders search, newest first without a sort
+    3: (
+        "DROP INDEX IF EXISTS idx_orders_status",
+        "DROP INDEX IF EXISTS idx_orders_payment_status",
+        "CREATE INDEX IF NOT EXISTS idx_orders_status_date ON laundry_orders (status, order_date DESC, id DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_orders_payment_status_date "
+        "ON laundry_orders (payment_status, order_date DESC, id DESC)",
+    ),
+    # pickup_ts mirrors pickup_date (local time text) as epoch seconds
+    4: (
+        '''
+        UPDATE laundry_orders
+        SET pickup_ts = CAST(strftime('%s', pickup_date, 'utc') AS INTEGER)
+        WHERE pickup_date IS NOT NULL AND pickup_ts IS NULL
+        ''',
+    ),
+}
+
+
+def apply_connection_profile(conn, profile=CONNECTION_PROFILE):
+    for pragma, value in profile.items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+
+
+class Database:
+    # Connection pool shared by every window and worker thread of a process.
+    # Reads go through one connection per thread, so a query on one thread can
+    # never clobber another thread's results; writes go through a single writer
+    # connection under a lock, so writers queue in-process instead of waiting
+    # on SQLite's file lock.
+
+    def __init__(self, path=DB_PATH, profile=CONNECTION_PROFILE, archive_path=None, profiler=None, metrics=None):
+        self.path = path
+        self.profile = profile
+        self.archive_path = archive_path
+        # profiling.Profiler that times every statement, or None
+        self.profiler = profiler
+        # metrics.Metrics that records commit latency and order writes, or None
+        self.metrics = metrics
+        # Order writes of the open transaction, counted once it commits
+        self.order_events = []
+
+        self.local = threading.local()
+        self.readers = []
+        self.readers_lock = threading.Lock()
+
+        self.writer = self.connect()
+        self.write_lock = threading.RLock()
+
+    def connect(self):
+        # Autocommit connections; transaction() issues BEGIN/COMMIT itself
+        conn = sqlite3.connect(self.path, timeout=self.profile.get("busy_timeout", 5000) / 1000,
+                               isolation_level=None, check_same_thread=False,
+                               factory=ProfiledConnection if self.profiler else sqlite3.Connection)
+        if self.profiler:
+            conn.profiler = self.profiler
+        apply_connection_profile(conn, self.profile)
+        if self.archive_path:
+            conn.execute("ATTACH DATABASE ? AS archive", (self.archive_path,))
+            if "journal_mode" in self.profile:
+                conn.execute(f"PRAGMA archive.journal_mode = {self.profile['journal_mode']}")
+        return conn
+
+    def reader(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = self.connect()
+            with self.readers_lock:
+                self.readers.append(conn)
+        return conn
+
+    def fetchall(self, sql, params=()):
+        return self.reader().execute(sql, params).fetchall()
+
+    def fetchone(self, sql, params=()):
+        return self.reader().execute(sql, params).fetchone()
+
+    @contextmanager
+    def transaction(self):
+        # Yields a cursor on the writer connection inside BEGIN IMMEDIATE;
+        # commits on success and rolls back on any exception
+        with self.write_lock:
+            cursor = self.writer.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            self.order_events = []
+            try:
+                yield cursor
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            started = time.perf_counter()
+            cursor.execute("COMMIT")
+            if self.metrics is not None:
+                self.metrics.commit_seconds.observe(time.perf_counter() - started)
+                for event in self.order_events:
+                    self.metrics.order_written(*event)
+
+    def count_order_writes(self):
+        # Has the writer connection report order writes to self.metrics (see
+        # ORDER_METRICS_TRIGGERS) and starts the per-status gauge from
+        # order_stats. Needs the schema in place.
+        self.writer.create_function("order_written", 5, self.record_order_write)
+        for statement in ORDER_METRICS_TRIGGERS:
+            self.writer.execute(statement)
+        self.seed_order_metrics()
+
+    def record_order_write(self, *event):
+        # Called by the triggers, inside the transaction, under write_lock
+        self.order_events.append(event)
+
+    def seed_order_metrics(self):
+        # Sets the per-status gauge to the counts in order_stats. Under
+        # write_lock, so no commit is counted twice or lost in between.
+        with self.write_lock:
+            counts = self.writer.execute("SELECT status, SUM(orders) FROM order_stats GROUP BY status").fetchall()
+            self.metrics.orders_by_status.reset(dict(counts))
+
+    def execute(self, sql, params=()):
+        # Single write statement in its own transaction; returns the row count
+        with self.transaction() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount
+
+    def insert(self, sql, params=()):
+        # Single INSERT in its own transaction; returns the new row id
+        with self.transaction() as cursor:
+            cursor.execute(sql, params)
+            return cursor.lastrowid
+
+    def executemany(self, sql, seq_of_params):
+        with self.transaction() as cursor:
+            cursor.executemany(sql, seq_of_params)
+            return cursor.rowcount
+
+    def close(self):
+        with self.readers_lock:
+            for conn in self.readers:
+                conn.close()
+            self.readers = []
+        with self.write_lock:
+            self.writer.close()
+
+
+def fetch_by_ids(db, query, ids, params=()):
+    # Runs query with its "{ids}" placeholder expanded to an IN list, in chunks
+    # small enough for SQLite's variable limit; params follow the ids
+    ids = list(ids)
+    rows = []
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        rows.extend(db.fetchall(query.format(ids=", ".join("?" * len(chunk))), tuple(chunk) + tuple(params)))
+    return rows
+
+
+def ensure_column(cursor, table, column, definition):
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def initialize_schema(db):
+    with db.transaction() as cursor:
+        # Create tables if they don't exist
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT UNIQUE NOT NULL,
+                password TEXT NOT NULL,
+                email TEXT UNIQUE NOT NULL,
+                phone TEXT,
+                is_admin INTEGER DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS laundry_orders (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                service_id INTEGER NOT NULL,
+                order_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                pickup_date TIMESTAMP,
+                status TEXT DEFAULT 'Pending',
+                weight REAL NOT NULL,
+                total_price REAL NOT NULL,
+                payment_method TEXT DEFAULT NULL,
+                payment_status TEXT DEFAULT 'Pending',
+                qr_code BLOB,
+                FOREIGN KEY (user_id) REFERENCES users (id),
+                FOREIGN KEY (service_id) REFERENCES services (id)
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS services (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                price_per_kg REAL NOT NULL,
+                description TEXT,
+                estimated_time_hours INTEGER NOT NULL
+            )
+        ''')
+
+        # Columns added after the first release
+        ensure_column(cursor, "laundry_orders", "qr_payload", "TEXT")
+        ensure_column(cursor, "laundry_orders", "qr_ref", "TEXT")
+        ensure_column(cursor, "laundry_orders", "pickup_ts", "INTEGER")
+
+        # Versioned index set
+        cursor.execute("PRAGMA user_version")
+        schema_version = cursor.fetchone()[0]
+        for version in range(schema_version + 1, SCHEMA_VERSION + 1):
+            for statement in SCHEMA_MIGRATIONS[version]:
+                cursor.execute(statement)
+            cursor.execute(f"PRAGMA user_version = {version}")
+
+        # Archive copy of laundry_orders, kept column-for-column in step with
+        # the live table so archive.py can move rows with INSERT ... SELECT
+        if db.archive_path:
+            cursor.execute("CREATE TABLE IF NOT EXISTS archive.laundry_orders (id INTEGER PRIMARY KEY)")
+            cursor.execute("PRAGMA archive.table_info(laundry_orders)")
+            archived_columns = {row[1] for row in cursor.fetchall()}
+            cursor.execute("PRAGMA main.table_info(laundry_orders)")
+            for row in cursor.fetchall():
+                if row[1] not in archived_columns:
+                    cursor.execute(f"ALTER TABLE archive.laundry_orders ADD COLUMN {row[1]} {row[2]}")
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS archive.idx_archive_orders_date_id
+                ON laundry_orders (order_date DESC, id DESC)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS archive.idx_archive_orders_user_date
+                ON laundry_orders (user_id, order_date DESC, id DESC)
+            ''')
+
+        # Change log written by triggers, read by incremental refresh
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS change_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
+                changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # Recreated on every start so existing databases pick up changes to
+        # the watched column lists
+        for table, columns in TRACKED_TABLES.items():
+            for event, row in (("INSERT", "NEW"), (f"UPDATE OF {', '.join(columns)}", "NEW"), ("DELETE", "OLD")):
+                trigger = f"{table}_{event.split()[0].lower()}_log"
+                cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+                cursor.execute(f'''
+                    CREATE TRIGGER {trigger}
+                    AFTER {event} ON {table}
+                    BEGIN
+                        INSERT INTO change_log (table_name, row_id) VALUES ('{table}', {row}.id);
+                    END
+                ''')
+
+        # Full-text index over customers, kept in step with users by triggers
+        if CUSTOMER_SEARCH_FTS:
+            cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'users_fts'")
+            if cursor.fetchone()[0] == 0:
+                try:
+                    cursor.execute('''
+                        CREATE VIRTUAL TABLE users_fts
+                        USING fts5(username, email, phone, content='users', content_rowid='id')
+                    ''')
+                except sqlite3.OperationalError:
+                    pass
+                else:
+                    cursor.execute("INSERT INTO users_fts (users_fts) VALUES ('rebuild')")
+                    cursor.execute('''
+                        CREATE TRIGGER users_fts_insert AFTER INSERT ON users
+                        BEGIN
+                            INSERT INTO users_fts (rowid, username, email, phone)
+                            VALUES (NEW.id, NEW.username, NEW.email, NEW.phone);
+                        END
+                    ''')
+                    cursor.execute('''
+                        CREATE TRIGGER users_fts_delete AFTER DELETE ON users
+                        BEGIN
+                            INSERT INTO users_fts (users_fts, rowid, username, email, phone)
+                            VALUES ('delete', OLD.id, OLD.username, OLD.email, OLD.phone);
+                        END
+                    ''')
+                    cursor.execute('''
+                        CREATE TRIGGER users_fts_update AFTER UPDATE OF username, email, phone ON users
+                        BEGIN
+                            INSERT INTO users_fts (users_fts, rowid, username, email, phone)
+                            VALUES ('delete', OLD.id, OLD.username, OLD.email, OLD.phone);
+                            INSERT INTO users_fts (rowid, username, email, phone)
+                            VALUES (NEW.id, NEW.username, NEW.email, NEW.phone);
+                        END
+                    ''')
+
+        cursor.execute(PRUNE_CHANGE_LOG_QUERY, (CHANGE_LOG_RETENTION,))
+
+        # Insert default services if none exist
+        cursor.execute("SELECT COUNT(*) FROM services")
+        if cursor.fetchone()[0] == 0:
+            default_services = [
+                ('Regular Wash', 5.0, 'Basic washing and drying', 24),
+                ('Express Wash', 8.0, 'Fast washing and drying (priority)', 12),
+                ('Dry Cleaning', 10.0, 'Professional dry cleaning', 48),
+                ('Ironing Only', 3.0, 'Ironing service without washing', 6)
+            ]
+            cursor.executemany('''
+                INSERT INTO services (name, price_per_kg, description, estimated_time_hours)
+                VALUES (?, ?, ?, ?)
+            ''', default_services)
+
+        # Create admin if not exists
+        cursor.execute("SELECT COUNT(*) FROM users WHERE is_admin = 1")
+        if cursor.fetchone()[0] == 0:
+            admin_password = hashlib.sha256("admin123".encode()).hexdigest()
+            cursor.execute('''
+                INSERT INTO users (username, password, email, is_admin)
+                VALUES (?, ?, ?, 1)
+            ''', ("admin", admin_password, "admin@laundry.com"))
+
+    if db.metrics is not None:
+        db.count_order_writes()
+
+
+def check_query_plans(db, checks):
+    # Fails loudly if any query in checks would scan a table or sort its result
+    # instead of searching an index. checks holds (name, query, sample params,
+    # may walk an index in order) tuples; "{ids}" lists are checked with one id.
+    problems = []
+    for name, query, params, may_walk_index in checks:
+        for row in db.fetchall("EXPLAIN QUERY PLAN " + query.format(ids="?"), params):
+            detail = row[3]
+            walks_index = detail.startswith("SCAN") and "USING" in detail and "INDEX" in detail
+            if (detail.startswith("SCAN") and not (may_walk_index and walks_index)) \
+                    or "TEMP B-TREE FOR ORDER BY" in detail:
+                problems.append(f"{name}: {detail}")
+
+    if problems:
+        raise RuntimeError("Query plan check failed:\n" + "\n".join(problems))
+
+
+def database_manager():
+    # Manager class for serve() and connect(); multiprocessing.managers is
+    # imported here since terminals on a local database never need it
+    from multiprocessing.managers import BaseManager
+
+    class DatabaseManager(BaseManager):
+        pass
+    return DatabaseManager
+
+
+# Methods of Database that remote terminals may call; transaction() needs the
+# caller's code to run next to the connection, so it is local-only
+REMOTE_METHODS = ("fetchall", "fetchone", "execute", "insert", "executemany")
+
+
+def archive_path_for(path):
+    # laundry.db -> laundry_archive.db in the same directory
+    root, ext = os.path.splitext(path)
+    return f"{root}_archive{ext or '.db'}"
+
+
+def default_archive_path(path):
+    return archive_path_for(path) if ATTACH_ARCHIVE else None
+
+
+def server_authkey(authkey=None):
+    # authkey, or the key from DB_SERVER_AUTHKEY_ENV
+    if authkey is None:
+        authkey = os.environ.get(DB_SERVER_AUTHKEY_ENV)
+    if not authkey:
+        raise ValueError(f"No database server key: set {DB_SERVER_AUTHKEY_ENV} or pass --authkey")
+    return authkey.encode() if isinstance(authkey, str) else authkey
+
+
+def serve(path=DB_PATH, address=None, authkey=None, archive_path=None):
+    # Stand-in database server for a shop with several counters: one process
+    # owns the pool, each terminal connection is served on its own thread (and
+    # so its own reader), and all writes queue on the single writer. address
+    # defaults to DB_SERVER_ADDRESS as it is when called.
+    authkey = server_authkey(authkey)
+    address = address or DB_SERVER_ADDRESS
+    db = Database(path, archive_path=archive_path or default_archive_path(path), profiler=PROFILER if PROFILE_QUERIES else None,
+                  metrics=METRICS if EXPORT_METRICS else None)
+    initialize_schema(db)
+    if EXPORT_METRICS:
+        MetricsExporter().start()
+
+    DatabaseManager = database_manager()
+    DatabaseManager.register("database", callable=lambda: db, exposed=REMOTE_METHODS)
+    server = DatabaseManager(address=address, authkey=authkey).get_server()
+    print(f"Serving {path} on {server.address[0]}:{server.address[1]}")
+    server.serve_forever()
+
+
+def connect(address=None, authkey=None):
+    # Proxy to a serve() process with the same query methods as Database;
+    # address defaults to DB_SERVER_ADDRESS as it is when called
+    DatabaseManager = database_manager()
+    DatabaseManager.register("database")
+    manager = DatabaseManager(address=address or DB_SERVER_ADDRESS, authkey=server_authkey(authkey))
+    manager.connect()
+    return manager.database()
+
+
+def open_database(path=DB_PATH, archive_path=None):
+    # Shared server when one is configured, otherwise a local pool on path
+    # with its archive (by default the one next to it) attached
+    if DB_SERVER_ADDRESS:
+        return connect()
+
+    db = Database(path, archive_path=archive_path or default_archive_path(path), profiler=PROFILER if PROFILE_QUERIES else None,
+                  metrics=METRICS if EXPORT_METRICS else None)
+    initialize_schema(db)
+    return db
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared laundry database server")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=50007)
+    parser.add_argument("--archive", help="archive database (default: <db name>_archive.db next to --db)")
+    parser.add_argument("--authkey", help=f"key terminals must present (default: ${DB_SERVER_AUTHKEY_ENV})")
+    args = parser.parse_args()
+
+    try:
+        authkey = server_authkey(args.authkey)
+    except ValueError as e:
+        parser.error(str(e))
+    serve(args.db, (args.host, args.port), authkey, archive_path=args.archive)
+
+
+if __name__ == "__main__":
+    main()
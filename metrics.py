@@ -0,0 +1,291 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Address of the Prometheus scrape endpoint (GET /metrics); None turns it off.
+# Only one process per machine can hold the port, so a second counter terminal
+# on the same machine carries on without an endpoint.
+METRICS_ADDRESS = ("127.0.0.1", 9464)
+
+# File for node_exporter's textfile collector (must end in .prom), rewritten
+# every METRICS_TEXTFILE_INTERVAL seconds; None turns it off
+METRICS_TEXTFILE_PATH = None
+METRICS_TEXTFILE_INTERVAL = 15
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+def format_labels(names, values):
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Metric:
+    # One metric family; values are kept per tuple of label values. Safe to
+    # update from any thread.
+
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.lock = threading.Lock()
+        self.values = {}
+        # Unlabelled counters and gauges read 0 until their first update
+        # instead of missing from the scrape
+        if not self.labels and self.kind in ("counter", "gauge"):
+            self.values[()] = 0
+
+    def key(self, label_values):
+        if len(label_values) != len(self.labels):
+            raise ValueError(f"{self.name} takes labels {self.labels}, got {label_values}")
+        return tuple(str(value) for value in label_values)
+
+    def samples(self):
+        # (suffix, label names, label values, value) in exposition order
+        with self.lock:
+            items = sorted(self.values.items())
+        return [("", self.labels, key, value) for key, value in items]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, names, values, value in self.samples():
+            lines.append(f"{self.name}{suffix}{format_labels(names, values)} {format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *label_values, amount=1):
+        key = self.key(label_values)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labels=(), function=None):
+        super().__init__(name, help_text, labels)
+        # For an unlabelled gauge read at scrape time from something already
+        # in memory, e.g. a queue length
+        self.function = function
+
+    def set(self, value, *label_values):
+        key = self.key(label_values)
+        with self.lock:
+            self.values[key] = value
+
+    def inc(self, *label_values, amount=1):
+        key = self.key(label_values)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+    def reset(self, values):
+        # Replaces every labelled value at once: {label value: value}, with
+        # labels no longer present set to 0
+        with self.lock:
+            for key in self.values:
+                self.values[key] = 0
+            for label_value, value in values.items():
+                self.values[self.key((label_value,))] = value
+
+    def set_function(self, function):
+        self.function = function
+
+    def samples(self):
+        if self.function is not None:
+            try:
+                return [("", (), (), self.function())]
+            except Exception as e:
+                print(f"Error reading metric {self.name}: {str(e)}")
+                return []
+        return super().samples()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *label_values):
+        key = self.key(label_values)
+        with self.lock:
+            counts = self.values.get(key)
+            if counts is None:
+                # Per-bucket counts (the last one for +Inf), then sum
+                counts = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, *label_values):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def samples(self):
+        with self.lock:
+            items = sorted((key, list(counts)) for key, counts in self.values.items())
+
+        samples = []
+        names = self.labels + ("le",)
+        for key, counts in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append(("_bucket", names, key + (format_value(bound),), cumulative))
+            samples.append(("_sum", self.labels, key, counts[-1]))
+            samples.append(("_count", self.labels, key, cumulative))
+        return samples
+
+
+class Metrics:
+    # The app's metrics. Counters only ever go up for the life of the process.
+    # Orders are counted by the process that commits them (see
+    # database.Database.count_order_writes): the shared server when there is
+    # one, otherwise each terminal for its own writes. The per-status gauge is
+    # seeded from order_stats and then moved by those writes, so a scrape never
+    # touches the database.
+
+    def __init__(self):
+        self.orders_submitted = Counter(
+            "laundry_orders_submitted_total", "Orders created")
+        self.payments_confirmed = Counter(
+            "laundry_payments_confirmed_total", "Orders marked Paid, by payment method", ("method",))
+        self.orders_by_status = Gauge(
+            "laundry_orders", "Orders per status, including archived ones", ("status",))
+        self.commit_seconds = Histogram(
+            "laundry_commit_seconds", "Time taken by COMMIT on the writer connection")
+        self.qr_render_seconds = Histogram(
+            "laundry_qr_render_seconds", "Time taken to render a receipt QR code PNG")
+        self.task_queue_depth = Gauge(
+            "laundry_task_queue_depth", "Background tasks submitted by the window and not yet finished")
+
+    def order_written(self, old_status, new_status, old_payment_status, new_payment_status, payment_method):
+        # One committed new order (old_status None) or change of an order's
+        # status or payment status; a payment counts once, when it turns Paid
+        if old_status is None:
+            self.orders_submitted.inc()
+        else:
+            self.orders_by_status.dec(old_status)
+        self.orders_by_status.inc(new_status)
+        if new_payment_status == "Paid" and old_payment_status != "Paid":
+            self.payments_confirmed.inc(payment_method or "Unknown")
+
+    def families(self):
+        return [value for value in vars(self).values() if isinstance(value, Metric)]
+
+    def render(self):
+        return "\n".join(metric.render() for metric in self.families()) + "\n"
+
+
+# Process-wide metrics updated by the Database pool, the QR renderer and the
+# window's task runner
+METRICS = Metrics()
+
+
+def metrics_handler():
+    # Request handler class for the endpoint; http.server is imported here
+    # so processes that export nothing never load it
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+
+            body = self.server.metrics.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # One line per scrape would bury everything else on the console
+            pass
+    return MetricsHandler
+
+
+class MetricsExporter:
+    # Publishes metrics over HTTP and/or as a textfile, each from its own
+    # daemon thread. Failing to bind the port or write the file is reported
+    # and otherwise ignored; metrics must never stop the counter.
+
+    def __init__(self, metrics=METRICS, address=METRICS_ADDRESS, textfile_path=METRICS_TEXTFILE_PATH,
+                 textfile_interval=METRICS_TEXTFILE_INTERVAL):
+        self.metrics = metrics
+        self.address = address
+        self.textfile_path = textfile_path
+        self.textfile_interval = textfile_interval
+        self.server = None
+        self.stopped = threading.Event()
+
+    def start(self):
+        if self.address:
+            from http.server import ThreadingHTTPServer
+            try:
+                self.server = ThreadingHTTPServer(self.address, metrics_handler())
+            except OSError as e:
+                print(f"Metrics endpoint not started on {self.address[0]}:{self.address[1]}: {str(e)}")
+            else:
+                self.server.daemon_threads = True
+                self.server.metrics = self.metrics
+                threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True).start()
+
+        if self.textfile_path:
+            threading.Thread(target=self.write_textfile_loop, name="metrics-textfile", daemon=True).start()
+        return self
+
+    def write_textfile(self):
+        # Write then rename so the collector never reads half a file
+        tmp_path = f"{self.textfile_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.metrics.render())
+        os.replace(tmp_path, self.textfile_path)
+
+    def write_textfile_loop(self):
+        while True:
+            try:
+                self.write_textfile()
+            except OSError as e:
+                print(f"Error writing metrics file: {str(e)}")
+            if self.stopped.wait(self.textfile_interval):
+                break
+
+    def stop(self):
+        self.stopped.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -0,0 +1,708 @@
+import hashlib
+import re
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from database import fetch_by_ids
+from qr_codes import build_receipt_info
+
+ORDER_STATUSES = ("Pending", "Processing", "Ready for Pickup", "Completed", "Cancelled")
+
+PAYMENT_METHODS = ("Cash", "Online Transfer")
+
+# Format of order_date and pickup_date in laundry_orders
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Pickup dates an admin may type; stored normalized to DATE_FORMAT
+PICKUP_DATE_FORMATS = (DATE_FORMAT, "%Y-%m-%d %H:%M", "%Y-%m-%d")
+
+# pickup_ts (epoch seconds) for a local-time pickup_date parameter, NULL for
+# NULL or unparseable text
+PICKUP_TS_SQL = "CAST(strftime('%s', ?, 'utc') AS INTEGER)"
+
+LOGIN_QUERY = '''
+    SELECT id, username, is_admin FROM users
+    WHERE username = ? AND password = ?
+'''
+
+ORDERS_FIRST_PAGE_QUERY = '''
+    SELECT o.id, u.username, o.order_date, o.pickup_date, o.status, o.weight,
+           o.total_price, o.payment_method, o.payment_status
+    FROM laundry_orders o
+    JOIN users u ON o.user_id = u.id
+    ORDER BY o.order_date DESC, o.id DESC
+    LIMIT ?
+'''
+
+ORDERS_NEXT_PAGE_QUERY = '''
+    SELECT o.id, u.username, o.order_date, o.pickup_date, o.status, o.weight,
+           o.total_price, o.payment_method, o.payment_status
+    FROM laundry_orders o
+    JOIN users u ON o.user_id = u.id
+    WHERE (o.order_date, o.id) < (?, ?)
+    ORDER BY o.order_date DESC, o.id DESC
+    LIMIT ?
+'''
+
+ORDERS_BY_ID_QUERY = '''
+    SELECT o.id, u.username, o.order_date, o.pickup_date, o.status, o.weight,
+           o.total_price, o.payment_method, o.payment_status
+    FROM laundry_orders o
+    JOIN users u ON o.user_id = u.id
+    WHERE o.id IN ({ids})
+'''
+
+CUSTOMER_ORDERS_QUERY = '''
+    SELECT id, order_date, pickup_date, status, weight, total_price,
+           payment_method, payment_status,
+           CASE WHEN status IN ('Completed', 'Cancelled') THEN NULL ELSE pickup_ts END
+    FROM laundry_orders
+    WHERE user_id = ?
+    ORDER BY order_date DESC, id DESC
+'''
+
+CUSTOMER_ORDERS_BY_ID_QUERY = '''
+    SELECT id, order_date, pickup_date, status, weight, total_price,
+           payment_method, payment_status,
+           CASE WHEN status IN ('Completed', 'Cancelled') THEN NULL ELSE pickup_ts END
+    FROM laundry_orders
+    WHERE id IN ({ids}) AND user_id = ?
+'''
+
+RECEIPT_QUERY = '''
+    SELECT o.id, u.username, s.name, o.weight, o.total_price,
+           o.order_date, o.pickup_date, o.status, o.payment_status, o.payment_method,
+           o.qr_code, o.qr_payload, o.qr_ref
+    FROM laundry_orders o
+    JOIN users u ON o.user_id = u.id
+    JOIN services s ON o.service_id = s.id
+    WHERE o.id = ?
+'''
+
+# Orders search: the grid query plus the predicates of an OrderFilter
+ORDERS_SEARCH_QUERY = '''
+    SELECT o.id, u.username, o.order_date, o.pickup_date, o.status, o.weight,
+           o.total_price, o.payment_method, o.payment_status
+    FROM laundry_orders o
+    JOIN users u ON o.user_id = u.id
+    WHERE {predicates}
+    ORDER BY o.order_date DESC, o.id DESC
+    LIMIT ?
+'''
+
+# Customers matching a search term, through the FTS5 index when it exists
+CUSTOMER_FTS_MATCH = "SELECT rowid FROM users_fts WHERE users_fts MATCH ?"
+CUSTOMER_LIKE_MATCH = "SELECT id FROM users WHERE username LIKE ? OR email LIKE ? OR phone LIKE ?"
+
+# Archived orders (see archive.py) by order id or by customer name
+ARCHIVE_BY_ID_QUERY = '''
+    SELECT o.id, u.username, o.order_date, o.pickup_date, o.status, o.weight,
+           o.total_price, o.payment_method, o.payment_status
+    FROM archive.laundry_orders o
+    JOIN users u ON o.user_id = u.id
+    WHERE o.id = ?
+'''
+
+ARCHIVE_BY_CUSTOMER_QUERY = '''
+    SELECT o.id, u.username, o.order_date, o.pickup_date, o.status, o.weight,
+           o.total_price, o.payment_method, o.payment_status
+    FROM users u
+    JOIN archive.laundry_orders o ON o.user_id = u.id
+    WHERE u.username LIKE ?
+    ORDER BY o.order_date DESC, o.id DESC
+    LIMIT ?
+'''
+
+ARCHIVED_RECEIPT_QUERY = RECEIPT_QUERY.replace("FROM laundry_orders o", "FROM archive.laundry_orders o")
+
+# Id the next order will get: past both the AUTOINCREMENT counter and any id
+# in use, so ids assigned here never reuse one SQLite has handed out
+NEXT_ORDER_ID_SQL = '''
+    MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'laundry_orders'), 0),
+        COALESCE((SELECT MAX(id) FROM laundry_orders), 0)) + 1
+'''
+
+# One order and its receipt text in a single statement; the text is stored as
+# the parts before and after the order id, which the statement assigns
+INSERT_ORDER_QUERY = f'''
+    INSERT INTO laundry_orders
+    (id, user_id, service_id, pickup_date, pickup_ts, weight, total_price, payment_method, payment_status,
+     qr_payload)
+    SELECT next.id, ?, ?, ?, ?, ?, ?, NULL, 'Pending', ? || next.id || ?
+    FROM (SELECT {NEXT_ORDER_ID_SQL} AS id) AS next
+'''
+
+# Stands in for the order id while receipt text is built ahead of the INSERT
+ORDER_ID_PLACEHOLDER = "#"
+
+SERVICE_COLUMNS = "id, name, price_per_kg, description, estimated_time_hours"
+
+# Ways order_stats can be grouped, mapped to their order_stats column
+STATS_DIMENSIONS = {
+    "day": "day",
+    "service": "service_id",
+    "status": "status",
+    "payment_status": "payment_status",
+}
+
+
+class OrderServiceError(Exception):
+    pass
+
+
+def hash_password(password: str) -> str:
+    # Form stored in users.password
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def parse_pickup_date(text: str) -> Optional[datetime]:
+    # None when text matches none of PICKUP_DATE_FORMATS
+    for date_format in PICKUP_DATE_FORMATS:
+        try:
+            return datetime.strptime(text.strip(), date_format)
+        except ValueError:
+            pass
+    return None
+
+
+class User(NamedTuple):
+    id: int
+    username: str
+    is_admin: bool
+
+
+class Service(NamedTuple):
+    id: int
+    name: str
+    price_per_kg: float
+    description: Optional[str]
+    estimated_time_hours: int
+
+
+class Quote(NamedTuple):
+    service_id: int
+    weight: float
+    price_per_kg: float
+    total_price: float
+    estimated_time_hours: int
+
+
+class NewOrder(NamedTuple):
+    id: int
+    user_id: int
+    service_id: int
+    weight: float
+    total_price: float
+    pickup_date: datetime
+    receipt_info: str
+
+
+class OrderSummary(NamedTuple):
+    # Row of the admin orders grid
+    id: int
+    customer: str
+    order_date: str
+    pickup_date: Optional[str]
+    status: str
+    weight: float
+    total_price: float
+    payment_method: Optional[str]
+    payment_status: Optional[str]
+
+
+class CustomerOrder(NamedTuple):
+    # Row of a customer's "My Orders" list; countdown_ts is the pickup time in
+    # epoch seconds while the order is still open, None otherwise
+    id: int
+    order_date: str
+    pickup_date: Optional[str]
+    status: str
+    weight: float
+    total_price: float
+    payment_method: Optional[str]
+    payment_status: Optional[str]
+    countdown_ts: Optional[int]
+
+
+class Receipt(NamedTuple):
+    id: int
+    customer: str
+    service: str
+    weight: float
+    total_price: float
+    order_date: str
+    pickup_date: Optional[str]
+    status: str
+    payment_status: Optional[str]
+    payment_method: Optional[str]
+    qr_code: Optional[bytes]
+    qr_payload: Optional[str]
+    qr_ref: Optional[str]
+
+
+class OrderFilter(NamedTuple):
+    # Predicates of the orders search; None (or "") leaves one out. Dates are
+    # YYYY-MM-DD and both ends of the range are inclusive.
+    order_id: Optional[int] = None
+    customer: Optional[str] = None
+    status: Optional[str] = None
+    payment_status: Optional[str] = None
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
+
+
+def build_search_query(order_filter: OrderFilter, limit: int, after: Optional[Tuple[str, int]] = None,
+                       customer_fts: bool = False, order_ids: Optional[List[int]] = None) -> Tuple[str, tuple]:
+    # Every predicate lands on an index: the id, a customer's orders, the
+    # (status|payment_status, order_date, id) indexes or the order_date range.
+    # order_ids restricts the search to those orders.
+    predicates = []
+    params = []
+    if order_filter.order_id is not None:
+        predicates.append("o.id = ?")
+        params.append(order_filter.order_id)
+    if order_ids is not None:
+        predicates.append(f"o.id IN ({', '.join('?' * len(order_ids))})")
+        params.extend(order_ids)
+    if order_filter.customer:
+        # Prefix match on every word, e.g. "ali gmail" -> "ali"* "gmail"*
+        words = re.findall(r"\w+", order_filter.customer)
+        if customer_fts and words:
+            predicates.append(f"o.user_id IN ({CUSTOMER_FTS_MATCH})")
+            params.append(" ".join(f'"{word}"*' for word in words))
+        else:
+            predicates.append(f"o.user_id IN ({CUSTOMER_LIKE_MATCH})")
+            params.extend([f"%{order_filter.customer}%"] * 3)
+    if order_filter.status:
+        predicates.append("o.status = ?")
+        params.append(order_filter.status)
+    if order_filter.payment_status:
+        predicates.append("o.payment_status = ?")
+        params.append(order_filter.payment_status)
+    if order_filter.date_from:
+        predicates.append("o.order_date >= ?")
+        params.append(order_filter.date_from)
+    if order_filter.date_to:
+        predicates.append("o.order_date < date(?, '+1 day')")
+        params.append(order_filter.date_to)
+    if after is not None:
+        predicates.append("(o.order_date, o.id) < (?, ?)")
+        params.extend(after)
+
+    query = ORDERS_SEARCH_QUERY.format(predicates=" AND ".join(predicates) or "1")
+    return query, tuple(params) + (limit,)
+
+
+# (name, query, sample parameters, may walk an index in order) for
+# database.check_query_plans
+ORDER_QUERY_PLAN_CHECKS = (
+    ("login", LOGIN_QUERY, ("admin", ""), False),
+    ("orders first page", ORDERS_FIRST_PAGE_QUERY, (100,), True),
+    ("orders next page", ORDERS_NEXT_PAGE_QUERY, ("", 0, 100), False),
+    ("orders by id", ORDERS_BY_ID_QUERY, (0,), False),
+    ("customer orders", CUSTOMER_ORDERS_QUERY, (0,), False),
+    ("customer orders by id", CUSTOMER_ORDERS_BY_ID_QUERY, (0, 0), False),
+    ("receipt", RECEIPT_QUERY, (0,), False),
+    ("search by status", *build_search_query(OrderFilter(status="Pending"), 100), False),
+    ("search by payment status", *build_search_query(OrderFilter(payment_status="Paid"), 100), False),
+    ("search by date range",
+     *build_search_query(OrderFilter(date_from="2024-01-01", date_to="2024-01-31"), 100), False),
+)
+
+
+class StatsRow(NamedTuple):
+    # One group of the dashboard aggregates
+    key: str
+    orders: int
+    weight: float
+    revenue: float
+
+
+class ServiceCatalog:
+    # Process-wide copy of the services table, keyed by id with a lookup by
+    # name. Every catalog write made through OrderService bumps version, and
+    # the next read reloads the whole table once; pricing otherwise never
+    # touches SQLite. Writes made by other processes show up after
+    # invalidate(), which the UI calls when change_log reports them.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = 0
+        self.loaded_version = None
+        self.by_id: Dict[int, Service] = {}
+        self.by_name: Dict[str, Service] = {}
+
+    def invalidate(self) -> None:
+        with self.lock:
+            self.version += 1
+
+    def snapshot(self, db) -> Dict[int, Service]:
+        with self.lock:
+            if self.loaded_version != self.version:
+                services = [Service(*row) for row in
+                            db.fetchall(f"SELECT {SERVICE_COLUMNS} FROM services ORDER BY id")]
+                self.by_id = {service.id: service for service in services}
+                self.by_name = {service.name: service for service in services}
+                self.loaded_version = self.version
+            return self.by_id
+
+    def get(self, db, service_id: int) -> Optional[Service]:
+        return self.snapshot(db).get(service_id)
+
+    def find(self, db, name: str) -> Optional[Service]:
+        self.snapshot(db)
+        return self.by_name.get(name)
+
+
+# Shared by every OrderService in the process
+SERVICE_CATALOG = ServiceCatalog()
+
+
+class OrderService:
+    # Order pipeline without any Tk: pricing, order creation, payments, status
+    # changes and the order listings. The UI, scripts, the API and benchmarks
+    # all drive orders through this class. db is a database.Database or a
+    # proxy from database.connect(); feed is an optional change_feed.ChangeFeed
+    # told about every write so open windows update at once. Metrics are
+    # counted by the database.Database that commits the writes.
+
+    def __init__(self, db, qr_store=None, catalog=SERVICE_CATALOG, feed=None):
+        self.db = db
+        self.qr_store = qr_store
+        self.catalog = catalog
+        self.feed = feed
+        self.customer_fts = None
+
+    def announce(self):
+        if self.feed is not None:
+            self.feed.notify()
+
+    def login(self, username: str, password: str) -> Optional[User]:
+        # None for an unknown username or a wrong password
+        row = self.db.fetchone(LOGIN_QUERY, (username, hash_password(password)))
+        return User(row[0], row[1], bool(row[2])) if row else None
+
+    # Service catalog, read from the cached copy
+
+    def list_services(self) -> List[Service]:
+        return list(self.catalog.snapshot(self.db).values())
+
+    def services_by_id(self, service_ids: Iterable[int]) -> List[Service]:
+        # Straight from the database, for change-log sync
+        rows = fetch_by_ids(self.db, f"SELECT {SERVICE_COLUMNS} FROM services WHERE id IN ({{ids}})", service_ids)
+        return [Service(*row) for row in rows]
+
+    def get_service(self, service_id: int) -> Service:
+        service = self.catalog.get(self.db, service_id)
+        if service is None:
+            raise OrderServiceError(f"Service {service_id} does not exist")
+        return service
+
+    def find_service(self, name: str) -> Service:
+        service = self.catalog.find(self.db, name)
+        if service is None:
+            raise OrderServiceError(f"Service {name!r} does not exist")
+        return service
+
+    def add_service(self, name: str, price_per_kg: float, description: str, estimated_time_hours: int) -> int:
+        try:
+            return self.db.insert('''
+                INSERT INTO services (name, price_per_kg, description, estimated_time_hours)
+                VALUES (?, ?, ?, ?)
+            ''', (name, price_per_kg, description, estimated_time_hours))
+        finally:
+            self.catalog.invalidate()
+            self.announce()
+
+    def update_service(self, service_id: int, name: str, price_per_kg: float, description: str,
+                       estimated_time_hours: int) -> None:
+        try:
+            self.db.execute('''
+                UPDATE services
+                SET name = ?, price_per_kg = ?, description = ?, estimated_time_hours = ?
+                WHERE id = ?
+            ''', (name, price_per_kg, description, estimated_time_hours, service_id))
+        finally:
+            self.catalog.invalidate()
+            self.announce()
+
+    def delete_service(self, service_id: int) -> None:
+        try:
+            self.db.execute("DELETE FROM services WHERE id = ?", (service_id,))
+        finally:
+            self.catalog.invalidate()
+            self.announce()
+
+    # Orders
+
+    def quote(self, service_id: int, weight: float) -> Quote:
+        return self.price(self.get_service(service_id), weight)
+
+    def price(self, service: Service, weight: float) -> Quote:
+        if weight <= 0:
+            raise OrderServiceError("Weight must be positive")
+
+        return Quote(service.id, weight, service.price_per_kg, weight * service.price_per_kg,
+                     service.estimated_time_hours)
+
+    def create_order(self, user_id: int, customer: str, service_id: int, weight: float) -> NewOrder:
+        # Inserts a Pending order priced from the catalog and stores the text of
+        # its receipt QR; rendering the QR itself is left to the caller
+        service = self.get_service(service_id)
+        quote = self.price(service, weight)
+        pickup_date = datetime.now() + timedelta(hours=quote.estimated_time_hours)
+
+        # The row and its receipt text go in with one statement, so a failure
+        # leaves no order behind and a retry cannot create a duplicate. The id
+        # is the first thing in the text, ahead of anything the customer typed.
+        receipt_info = build_receipt_info(ORDER_ID_PLACEHOLDER, customer, service.name, weight, quote.total_price,
+                                          pickup_date)
+        before_id, after_id = receipt_info.split(ORDER_ID_PLACEHOLDER, 1)
+
+        # Insert order with NULL payment_method (to be selected in payment dialog)
+        order_id = self.db.insert(INSERT_ORDER_QUERY, (user_id, service_id, pickup_date.strftime(DATE_FORMAT),
+                                                       int(pickup_date.timestamp()), weight, quote.total_price,
+                                                       before_id, after_id))
+        receipt_info = before_id + str(order_id) + after_id
+        self.announce()
+
+        return NewOrder(order_id, user_id, service_id, weight, quote.total_price, pickup_date, receipt_info)
+
+    def create_orders(self, orders: Iterable[Tuple[int, str, int, float]]) -> List[NewOrder]:
+        # Bulk version of create_order for (user_id, customer, service_id,
+        # weight) tuples: one transaction and one executemany, with the receipt
+        # text written alongside each row. All or nothing. Needs a local
+        # database.Database, as the shared server has no transaction().
+        catalog = self.catalog.snapshot(self.db)
+        now = datetime.now()
+
+        with self.db.transaction() as cursor:
+            # Ids are assigned here rather than by SQLite so the receipt text,
+            # which includes the id, goes in with the row; BEGIN IMMEDIATE
+            # keeps any other writer out until COMMIT
+            cursor.execute(f"SELECT {NEXT_ORDER_ID_SQL}")
+            next_id = cursor.fetchone()[0]
+
+            created = []
+            rows = []
+            for user_id, customer, service_id, weight in orders:
+                service = catalog.get(service_id)
+                if service is None:
+                    raise OrderServiceError(f"Service {service_id} does not exist")
+                quote = self.price(service, weight)
+                pickup_date = now + timedelta(hours=quote.estimated_time_hours)
+                receipt_info = build_receipt_info(next_id, customer, service.name, weight, quote.total_price,
+                                                  pickup_date)
+
+                created.append(NewOrder(next_id, user_id, service_id, weight, quote.total_price, pickup_date,
+                                        receipt_info))
+                rows.append((next_id, user_id, service_id, pickup_date.strftime(DATE_FORMAT),
+                             int(pickup_date.timestamp()), weight, quote.total_price, receipt_info))
+                next_id += 1
+
+            cursor.executemany('''
+                INSERT INTO laundry_orders
+                (id, user_id, service_id, pickup_date, pickup_ts, weight, total_price, payment_method,
+                 payment_status, qr_payload)
+                VALUES (?, ?, ?, ?, ?, ?, ?, NULL, 'Pending', ?)
+            ''', rows)
+
+        self.announce()
+        return created
+
+    def attach_qr(self, order_id: int, qr_bytes: bytes) -> None:
+        self.attach_qrs([(order_id, qr_bytes)])
+
+    def attach_qrs(self, qr_codes: Iterable[Tuple[int, bytes]]) -> None:
+        # (order_id, PNG bytes) pairs, written in one transaction
+        if self.qr_store:
+            refs = [(self.qr_store.put(qr_bytes), order_id) for order_id, qr_bytes in qr_codes]
+            self.db.executemany("UPDATE laundry_orders SET qr_ref = ? WHERE id = ?", refs)
+        else:
+            self.db.executemany("UPDATE laundry_orders SET qr_code = ? WHERE id = ?",
+                                [(qr_bytes, order_id) for order_id, qr_bytes in qr_codes])
+
+    def choose_cash_payment(self, order_id: int) -> None:
+        # Cash is paid at pickup, so the order stays unpaid
+        self.db.execute('''
+            UPDATE laundry_orders
+            SET payment_method = 'Cash',
+                payment_status = 'Pending'
+            WHERE id = ?
+        ''', (order_id,))
+        self.announce()
+
+    def mark_paid(self, order_id: int, payment_method: str = "Online Transfer") -> None:
+        if payment_method not in PAYMENT_METHODS:
+            raise OrderServiceError(f"Unknown payment method: {payment_method}")
+
+        self.db.execute('''
+            UPDATE laundry_orders
+            SET payment_method = ?,
+                payment_status = 'Paid'
+            WHERE id = ?
+        ''', (payment_method, order_id))
+        self.announce()
+
+    def update_status(self, order_id: int, status: str, pickup_date: Optional[str] = None) -> None:
+        self.update_statuses([order_id], status, pickup_date)
+
+    def update_statuses(self, order_ids: Iterable[int], status: str, pickup_date: Optional[str] = None) -> int:
+        # Moves every order in order_ids to status in a single UPDATE, so a
+        # whole machine load changes atomically; returns the number updated
+        if status not in ORDER_STATUSES:
+            raise OrderServiceError(f"Unknown order status: {status}")
+
+        if pickup_date is not None and not pickup_date.strip():
+            pickup_date = None
+        if pickup_date is not None:
+            parsed = parse_pickup_date(pickup_date)
+            if parsed is None:
+                raise OrderServiceError("Please enter the pickup date as YYYY-MM-DD HH:MM")
+            pickup_date = parsed.strftime(DATE_FORMAT)
+
+        order_ids = list(order_ids)
+        if not order_ids:
+            return 0
+
+        updated = self.db.execute(f'''
+            UPDATE laundry_orders
+            SET status = ?, pickup_date = ?, pickup_ts = {PICKUP_TS_SQL}
+            WHERE id IN ({", ".join("?" * len(order_ids))})
+        ''', (status, pickup_date, pickup_date, *order_ids))
+        self.announce()
+        return updated
+
+    # Listings
+
+    def list_orders(self, limit: int, after: Optional[Tuple[str, int]] = None) -> List[OrderSummary]:
+        # Newest first; pass the (order_date, id) of the last row seen as after
+        # to get the next page
+        if after is None:
+            rows = self.db.fetchall(ORDERS_FIRST_PAGE_QUERY, (limit,))
+        else:
+            rows = self.db.fetchall(ORDERS_NEXT_PAGE_QUERY, tuple(after) + (limit,))
+        return [OrderSummary(*row) for row in rows]
+
+    def search_orders(self, order_filter: OrderFilter, limit: int,
+                      after: Optional[Tuple[str, int]] = None) -> List[OrderSummary]:
+        # Same paging contract as list_orders, restricted to order_filter
+        query, params = build_search_query(order_filter, limit, after, self.has_customer_fts())
+        return [OrderSummary(*row) for row in self.db.fetchall(query, params)]
+
+    def search_orders_by_id(self, order_filter: OrderFilter, order_ids: Iterable[int]) -> List[OrderSummary]:
+        # The orders among order_ids that match order_filter, for change-log
+        # sync of a filtered grid; the others have left the view or are gone
+        order_ids = list(order_ids)
+        orders = []
+        for i in range(0, len(order_ids), 500):
+            chunk = order_ids[i:i + 500]
+            query, params = build_search_query(order_filter, len(chunk), customer_fts=self.has_customer_fts(),
+                                               order_ids=chunk)
+            orders.extend(OrderSummary(*row) for row in self.db.fetchall(query, params))
+        return orders
+
+    def has_customer_fts(self) -> bool:
+        if self.customer_fts is None:
+            self.customer_fts = self.db.fetchone(
+                "SELECT COUNT(*) FROM sqlite_master WHERE name = 'users_fts'")[0] > 0
+        return self.customer_fts
+
+    def orders_by_id(self, order_ids: Iterable[int]) -> List[OrderSummary]:
+        return [OrderSummary(*row) for row in fetch_by_ids(self.db, ORDERS_BY_ID_QUERY, order_ids)]
+
+    def list_customer_orders(self, user_id: int) -> List[CustomerOrder]:
+        return [CustomerOrder(*row) for row in self.db.fetchall(CUSTOMER_ORDERS_QUERY, (user_id,))]
+
+    def customer_orders_by_id(self, user_id: int, order_ids: Iterable[int]) -> List[CustomerOrder]:
+        rows = fetch_by_ids(self.db, CUSTOMER_ORDERS_BY_ID_QUERY, order_ids, (user_id,))
+        return [CustomerOrder(*row) for row in rows]
+
+    def get_receipt(self, order_id: int) -> Optional[Receipt]:
+        row = self.db.fetchone(RECEIPT_QUERY, (order_id,))
+        if row is None and self.has_archive():
+            row = self.db.fetchone(ARCHIVED_RECEIPT_QUERY, (order_id,))
+        return Receipt(*row) if row else None
+
+    def has_archive(self) -> bool:
+        return any(row[1] == "archive" for row in self.db.fetchall("PRAGMA database_list"))
+
+    def search_archive(self, term: str, limit: int = 100) -> List[OrderSummary]:
+        # Archived orders are only read on request: "#123" or "123" finds an
+        # order id, anything else matches customer names
+        if not self.has_archive():
+            raise OrderServiceError("No archive database is configured")
+
+        term = term.strip()
+        if term.lstrip("#").isdigit():
+            rows = self.db.fetchall(ARCHIVE_BY_ID_QUERY, (int(term.lstrip("#")),))
+        else:
+            rows = self.db.fetchall(ARCHIVE_BY_CUSTOMER_QUERY, (f"%{term}%", limit))
+        return [OrderSummary(*row) for row in rows]
+
+    def receipt_info(self, receipt: Receipt) -> str:
+        # Text encoded in the receipt QR; rebuilt from the order for orders
+        # stored without one
+        if receipt.qr_payload:
+            return receipt.qr_payload
+
+        # Dates stored before update_statuses normalized them may be in any
+        # format; those are printed as they are
+        pickup_date = None
+        if receipt.pickup_date:
+            pickup_date = parse_pickup_date(receipt.pickup_date) or receipt.pickup_date
+        return build_receipt_info(receipt.id, receipt.customer, receipt.service, receipt.weight,
+                                  receipt.total_price, pickup_date, receipt.status)
+
+    def receipt_with_qr(self, order_id: int, qr_cache=None) -> tuple:
+        # (receipt, PNG or None, text to render when there is no PNG), all None
+        # for an unknown order. The PNG comes from the order, the QR store or
+        # qr_cache, a qr_codes.QRCache, so this reads files too.
+        receipt = self.get_receipt(order_id)
+        if receipt is None:
+            return None, None, None
+
+        qr_bytes = self.receipt_qr(receipt)
+        if qr_bytes:
+            return receipt, qr_bytes, None
+        receipt_info = self.receipt_info(receipt)
+        return receipt, qr_cache.get(receipt.id, receipt_info) if qr_cache else None, receipt_info
+
+    def receipt_qr(self, receipt: Receipt) -> Optional[bytes]:
+        # Stored PNG for the receipt, if any; None means render receipt_info()
+        if receipt.qr_code:
+            return receipt.qr_code
+        if receipt.qr_ref and self.qr_store:
+            return self.qr_store.get(receipt.qr_ref)
+        return None
+
+    # Dashboard aggregates, read from order_stats only
+
+    def order_stats(self, group_by: str, days: Optional[int] = None) -> List[StatsRow]:
+        # Totals per group_by (a STATS_DIMENSIONS key) over the last days
+        # days including today, or over all history when days is None
+        column = STATS_DIMENSIONS.get(group_by)
+        if column is None:
+            raise OrderServiceError(f"Unknown statistics grouping: {group_by}")
+
+        where = ""
+        params = ()
+        if days is not None:
+            where = "WHERE day >= date('now', ?)"
+            params = (f"-{max(days, 1) - 1} days",)
+
+        rows = self.db.fetchall(f'''
+            SELECT {column}, SUM(orders), SUM(weight), SUM(revenue)
+            FROM order_stats
+            {where}
+            GROUP BY {column}
+            ORDER BY {column} {"DESC" if group_by == "day" else "ASC"}
+        ''', params)
+
+        if group_by == "service":
+            # Orders of a deleted service still count under its old id
+            catalog = self.catalog.snapshot(self.db)
+            rows = [(catalog[row[0]].name if row[0] in catalog else f"Service #{row[0]}",) + tuple(row[1:])
+                    for row in rows]
+        return [StatsRow(*row) for row in rows]
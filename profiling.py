@@ -0,0 +1,226 @@
+import bisect
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+
+# Operations slower than this (ms) are written to the slow-operation log
+SLOW_OPERATION_MS = 100
+
+# Slow-operation log, appended to; None keeps slow operations in memory only
+SLOW_LOG_PATH = "slow_operations.log"
+
+# Where the Diagnostics tab's "Dump JSON" writes the collected statistics
+PROFILE_DUMP_PATH = "profile.json"
+
+# Upper bounds (ms) of the histogram buckets; slower samples land in one
+# overflow bucket
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+# Slow operations kept in memory for the Diagnostics tab
+RECENT_SLOW_OPERATIONS = 50
+
+WHITESPACE = re.compile(r"\s+")
+PLACEHOLDER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+# Statements EXPLAIN QUERY PLAN can describe
+EXPLAINABLE = re.compile(r"\s*(SELECT|INSERT|UPDATE|DELETE|REPLACE|WITH)\b", re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(sql):
+    # One line per statement, and "{ids}" lists of any length counted together
+    return PLACEHOLDER_LIST.sub("?, ...", WHITESPACE.sub(" ", sql).strip())
+
+
+class Histogram:
+    # Count, total and max of an operation's durations, plus counts per
+    # HISTOGRAM_BUCKETS_MS bucket for percentiles
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+
+    def add(self, ms):
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.buckets[bisect.bisect_left(HISTOGRAM_BUCKETS_MS, ms)] += 1
+
+    def percentile(self, fraction):
+        # Upper bound of the bucket holding the given fraction of samples;
+        # the overflow bucket reports the slowest sample seen
+        target = fraction * self.count
+        seen = 0
+        for bound, count in zip(HISTOGRAM_BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= target:
+                return round(min(bound, self.max_ms), 1)
+        return round(self.max_ms, 1)
+
+
+class Profiler:
+    # Per-operation histograms for SQL statements ("sql"), Tk callbacks
+    # ("callback"), background tasks ("task") and how long screens take to
+    # become ready ("ready"). Safe to record into from any thread. Operations
+    # slower than slow_ms also go to the slow-operation log, SQL with its
+    # EXPLAIN QUERY PLAN.
+
+    def __init__(self, slow_ms=SLOW_OPERATION_MS, slow_log_path=SLOW_LOG_PATH):
+        self.slow_ms = slow_ms
+        self.slow_log_path = slow_log_path
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.slow = deque(maxlen=RECENT_SLOW_OPERATIONS)
+        self.started = datetime.now()
+
+    def record(self, kind, name, seconds, explain=None):
+        # explain, if given, returns the query plan and is only called when
+        # the operation turned out to be slow
+        ms = seconds * 1000
+        with self.lock:
+            histogram = self.histograms.get((kind, name))
+            if histogram is None:
+                histogram = self.histograms[(kind, name)] = Histogram()
+            histogram.add(ms)
+
+        if ms >= self.slow_ms:
+            plan = None
+            if explain is not None:
+                try:
+                    plan = explain()
+                except Exception as e:
+                    plan = [f"(no plan: {str(e)})"]
+            self.log_slow(kind, name, ms, plan)
+
+    def log_slow(self, kind, name, ms, plan):
+        entry = {
+            "at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "kind": kind,
+            "name": name,
+            "ms": round(ms, 1),
+            "plan": plan,
+        }
+        with self.lock:
+            self.slow.append(entry)
+            if self.slow_log_path:
+                lines = [f"{entry['at']} {kind} {entry['ms']} ms: {name}"]
+                lines.extend(f"    {step}" for step in plan or ())
+                try:
+                    with open(self.slow_log_path, "a") as f:
+                        f.write("\n".join(lines) + "\n")
+                except OSError as e:
+                    print(f"Error writing slow-operation log: {str(e)}")
+
+    @contextmanager
+    def timed(self, kind, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(kind, name, time.perf_counter() - started)
+
+    def wrap(self, kind, name, func):
+        def timed_call(*args, **kwargs):
+            with self.timed(kind, name):
+                return func(*args, **kwargs)
+        return timed_call
+
+    def stats(self):
+        # One dict per operation, slowest total first
+        with self.lock:
+            items = [(key, histogram, list(histogram.buckets)) for key, histogram in self.histograms.items()]
+
+        rows = []
+        for (kind, name), histogram, buckets in items:
+            rows.append({
+                "kind": kind,
+                "name": name,
+                "count": histogram.count,
+                "total_ms": round(histogram.total_ms, 1),
+                "mean_ms": round(histogram.total_ms / histogram.count, 2),
+                "p50_ms": histogram.percentile(0.5),
+                "p95_ms": histogram.percentile(0.95),
+                "max_ms": round(histogram.max_ms, 1),
+                "buckets": dict(zip([f"<={bound}" for bound in HISTOGRAM_BUCKETS_MS] + ["more"], buckets)),
+            })
+        rows.sort(key=lambda row: row["total_ms"], reverse=True)
+        return rows
+
+    def recent_slow(self):
+        with self.lock:
+            return list(self.slow)
+
+    def snapshot(self):
+        return {
+            "since": self.started.strftime("%Y-%m-%d %H:%M:%S"),
+            "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "slow_threshold_ms": self.slow_ms,
+            "operations": self.stats(),
+            "slow_operations": self.recent_slow(),
+        }
+
+    def dump(self, path=PROFILE_DUMP_PATH):
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        return path
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+            self.slow.clear()
+            self.started = datetime.now()
+
+
+# Process-wide profiler shared by the Database pool, the Tk window and the
+# task runner
+PROFILER = Profiler()
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    # Times execute() and executemany() into the connection's profiler. For a
+    # SELECT that covers planning and stepping to the first row, which is where
+    # sorts, aggregates and scans spend their time.
+
+    def execute(self, sql, params=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            explain = (lambda: self.explain(sql, params)) if EXPLAINABLE.match(sql) else None
+            self.connection.profiler.record("sql", normalize_sql(sql), time.perf_counter() - started, explain)
+
+    def executemany(self, sql, seq_of_params):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_params)
+        finally:
+            self.connection.profiler.record("sql", normalize_sql(sql), time.perf_counter() - started)
+
+    def explain(self, sql, params):
+        # A plain cursor, so the EXPLAIN itself is not profiled
+        rows = sqlite3.Cursor(self.connection).execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+        return [row[3] for row in rows]
+
+
+class ProfiledConnection(sqlite3.Connection):
+    # sqlite3.connect(factory=ProfiledConnection). The C implementation of
+    # Connection.execute creates its cursor without calling cursor(), so the
+    # shortcuts are overridden too and every statement is timed.
+
+    profiler = PROFILER
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
@@ -0,0 +1,240 @@
+import argparse
+import hashlib
+import mmap
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+from metrics import METRICS
+
+# Rendered receipt QR codes kept in memory by QRCache
+QR_CACHE_SIZE = 256
+
+# Optional directory where QRCache also keeps rendered PNGs between runs
+QR_CACHE_DIR = None
+
+# Content-addressed store for receipt PNGs; when set, new PNGs are written here
+# and laundry_orders.qr_ref points at them instead of filling qr_code
+QR_STORE_DIR = None
+
+# Orders moved per transaction by the qr_code -> QRStore migration
+QR_MIGRATION_BATCH_SIZE = 500
+
+
+def format_pickup_date(pickup_date):
+    if not pickup_date:
+        return "Not set"
+    if isinstance(pickup_date, str):
+        return pickup_date
+    return pickup_date.strftime('%Y-%m-%d %H:%M')
+
+
+def build_receipt_info(order_id, customer, service, weight, total_price, pickup_date, status="Pending"):
+    # Text encoded in the receipt QR code; pickup_date is a datetime, or text
+    # printed as it is
+    return (
+        f"Laundry Service Receipt\n"
+        f"Order ID: {order_id}\n"
+        f"Customer: {customer}\n"
+        f"Service: {service}\n"
+        f"Weight: {weight} kg\n"
+        f"Amount: RM{total_price:.2f}\n"
+        f"Pickup Date: {format_pickup_date(pickup_date)}\n"
+        f"Status: {status}"
+    )
+
+
+def render_qr_png(data, box_size=10, border=4):
+    # qrcode and PIL are imported on first use; together they cost more at
+    # import time than the rest of the app, and most sessions never render
+    import qrcode
+
+    with METRICS.qr_render_seconds.time():
+        qr = qrcode.QRCode(
+            version=1,
+            error_correction=qrcode.constants.ERROR_CORRECT_L,
+            box_size=box_size,
+            border=border,
+        )
+        qr.add_data(data)
+        qr.make(fit=True)
+
+        qr_img = qr.make_image(fill_color="black", back_color="white")
+        img_byte_arr = BytesIO()
+        qr_img.save(img_byte_arr, format='PNG')
+        return img_byte_arr.getvalue()
+
+
+def render_qr_image(data, size, box_size=8, border=4):
+    # PIL image scaled to size x size, ready to be wrapped in an ImageTk.PhotoImage
+    import qrcode
+    from PIL import Image
+
+    qr = qrcode.QRCode(version=1, box_size=box_size, border=border)
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    qr_img = qr.make_image(fill_color="black", back_color="white")
+    return qr_img.resize((size, size), Image.Resampling.LANCZOS)
+
+
+class QRCache:
+    # Bounded LRU cache of rendered receipt PNGs keyed by order id and a hash of
+    # the encoded text, so an edited payload never serves a stale image.
+    # Safe to use from the task runner's worker threads.
+
+    def __init__(self, max_entries=QR_CACHE_SIZE, cache_dir=QR_CACHE_DIR):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key(self, order_id, payload):
+        return f"{order_id}-{hashlib.sha256(payload.encode()).hexdigest()[:16]}"
+
+    def get(self, order_id, payload):
+        key = self.key(order_id, payload)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+
+        if self.cache_dir:
+            try:
+                with open(os.path.join(self.cache_dir, key + ".png"), "rb") as f:
+                    qr_bytes = f.read()
+            except FileNotFoundError:
+                return None
+            self.remember(key, qr_bytes)
+            return qr_bytes
+
+        return None
+
+    def put(self, order_id, payload, qr_bytes):
+        key = self.key(order_id, payload)
+        self.remember(key, qr_bytes)
+
+        if self.cache_dir:
+            # Write then rename so a concurrent reader never sees half a file
+            path = os.path.join(self.cache_dir, key + ".png")
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(qr_bytes)
+            os.replace(tmp_path, path)
+
+    def remember(self, key, qr_bytes):
+        with self.lock:
+            self.entries[key] = qr_bytes
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def get_or_render(self, order_id, payload):
+        qr_bytes = self.get(order_id, payload)
+        if qr_bytes is None:
+            qr_bytes = render_qr_png(payload)
+            self.put(order_id, payload, qr_bytes)
+        return qr_bytes
+
+
+class QRStore:
+    # PNGs stored as <root>/<first two hex digits>/<sha256>.png. Identical images
+    # share one file, and files are never modified once written.
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def path(self, digest):
+        return os.path.join(self.root_dir, digest[:2], digest + ".png")
+
+    def put(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return digest
+
+    def get(self, digest):
+        # Returns None when the file is missing so callers can re-render
+        try:
+            with open(self.path(digest), "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                return m[:]
+        except (FileNotFoundError, ValueError):
+            return None
+
+
+def migrate_qr_blobs(conn, store, batch_size=QR_MIGRATION_BATCH_SIZE, progress=print):
+    # Streams laundry_orders.qr_code BLOBs into store in id order, replacing each
+    # with a qr_ref, then hands the freed pages back to the filesystem.
+    # Returns the number of orders migrated.
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(laundry_orders)")}
+    if "qr_ref" not in columns:
+        conn.execute("ALTER TABLE laundry_orders ADD COLUMN qr_ref TEXT")
+        conn.commit()
+
+    migrated = 0
+    last_id = 0
+    while True:
+        rows = conn.execute('''
+            SELECT id, qr_code FROM laundry_orders
+            WHERE id > ? AND qr_code IS NOT NULL
+            ORDER BY id
+            LIMIT ?
+        ''', (last_id, batch_size)).fetchall()
+        if not rows:
+            break
+
+        refs = [(store.put(qr_code), order_id) for order_id, qr_code in rows]
+        conn.executemany("UPDATE laundry_orders SET qr_ref = ?, qr_code = NULL WHERE id = ?", refs)
+        conn.commit()
+
+        migrated += len(rows)
+        last_id = rows[-1][0]
+        progress(f"Migrated {migrated} QR codes (up to order #{last_id})")
+
+    # auto_vacuum only changes with a full VACUUM; afterwards an incremental
+    # vacuum is enough to release pages freed by later migrations
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        conn.execute("PRAGMA incremental_vacuum")
+    else:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+
+    return migrated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Laundry receipt QR code maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate-store",
+                                           help="move qr_code BLOBs into a content-addressed file store")
+    migrate_parser.add_argument("--db", default="laundry.db")
+    migrate_parser.add_argument("--store", required=True, help="directory of the QR store")
+    migrate_parser.add_argument("--batch-size", type=int, default=QR_MIGRATION_BATCH_SIZE)
+
+    args = parser.parse_args()
+
+    if args.command == "migrate-store":
+        size_before = os.path.getsize(args.db)
+        conn = sqlite3.connect(args.db)
+        try:
+            migrated = migrate_qr_blobs(conn, QRStore(args.store), args.batch_size)
+        finally:
+            conn.close()
+        size_after = os.path.getsize(args.db)
+        print(f"Migrated {migrated} QR codes; {args.db}: {size_before:,} -> {size_after:,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+# Worker threads running database calls and QR renders for the Tk window;
+# each thread gets its own reader connection from the Database pool
+TASK_WORKERS = 4
+
+# How often (ms) the Tk loop checks for finished tasks while any are pending;
+# about one frame at 60 fps
+TASK_POLL_INTERVAL = 15
+
+
+class Task:
+    # Handle for a submitted call; cancel() drops its result, and stops the
+    # call altogether if no worker has picked it up yet
+
+    def __init__(self, key):
+        self.key = key
+        self.future = None
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+        self.future.cancel()
+
+
+class TaskRunner:
+    # Runs blocking calls on worker threads and hands each result back to the
+    # Tk loop, where callbacks may safely touch widgets. A task submitted with
+    # a key supersedes the pending task with the same key, so only the newest
+    # refresh of a view is ever painted. Unkeyed tasks (writes) always run.
+
+    def __init__(self, root, workers=TASK_WORKERS, on_busy=None, profiler=None):
+        self.root = root
+        # profiling.Profiler that times each task on its worker, or None
+        self.profiler = profiler
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ui-task")
+        self.results = queue.Queue()
+        self.pending = 0
+        self.latest = {}
+        self.poll_after = None
+        self.is_busy = False
+        # Called with True when work starts and False once nothing is pending
+        self.on_busy = on_busy
+
+    def submit(self, func, *args, callback=None, error=None, key=None, **kwargs):
+        # Must be called from the Tk main thread. callback gets the result and
+        # error the exception, both on the Tk loop.
+        if key is not None:
+            self.cancel(key)
+
+        task = Task(key)
+        if self.profiler is not None:
+            func = self.profiler.wrap("task", key or getattr(func, "__qualname__", repr(func)), func)
+        task.future = self.executor.submit(func, *args, **kwargs)
+        task.future.add_done_callback(lambda future: self.results.put((task, callback, error)))
+        if key is not None:
+            self.latest[key] = task
+
+        self.pending += 1
+        self.set_busy(True)
+        if self.poll_after is None:
+            self.poll_after = self.root.after(TASK_POLL_INTERVAL, self.poll)
+        return task
+
+    def busy(self, key):
+        return key in self.latest
+
+    def cancel(self, key=None):
+        # Cancels the task with key, or every keyed task when key is None
+        keys = [key] if key is not None else list(self.latest)
+        for key in keys:
+            task = self.latest.pop(key, None)
+            if task is not None:
+                task.cancel()
+
+    def poll(self):
+        self.poll_after = None
+        while True:
+            try:
+                task, callback, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+
+            self.pending -= 1
+            if self.latest.get(task.key) is task:
+                del self.latest[task.key]
+            if task.cancelled:
+                continue
+
+            try:
+                try:
+                    result = task.future.result()
+                except Exception as e:
+                    if error is None:
+                        raise
+                    error(e)
+                else:
+                    if callback is not None:
+                        callback(result)
+            except Exception as e:
+                print(f"Error in background task: {str(e)}")
+
+        if self.pending:
+            if self.poll_after is None:
+                self.poll_after = self.root.after(TASK_POLL_INTERVAL, self.poll)
+        else:
+            self.set_busy(False)
+
+    def set_busy(self, busy):
+        if busy != self.is_busy:
+            self.is_busy = busy
+            if self.on_busy:
+                self.on_busy(busy)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)